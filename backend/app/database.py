@@ -15,13 +15,22 @@ Collections:
 Author: Backend Team
 """
 
-from pymongo import MongoClient
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, OrderedDict
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.collation import Collation
 from dotenv import load_dotenv
 import os
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # ============================================================================
 # DATABASE CONNECTION
 # ============================================================================
@@ -37,11 +46,17 @@ if not MONGODB_URL:
         "Please check your .env file."
     )
 
-# Create MongoDB client with connection pooling
-client = MongoClient(
+# Create async MongoDB client with connection pooling.
+# Motor keeps the event loop free during Atlas round-trips - the old
+# synchronous PyMongo client blocked every other request for the full
+# ~20-50ms of each query.
+client = AsyncIOMotorClient(
     MONGODB_URL,
-    serverSelectionTimeoutMS=5000,  # 5 second timeout
-    maxPoolSize=50,  # Connection pool
+    serverSelectionTimeoutMS=5000,  # Fail fast if Atlas is unreachable
+    maxPoolSize=50,     # Cap sockets so bursts reuse instead of churning connects
+    minPoolSize=5,      # Keep warm connections - a cold TCP+TLS+auth is 50-500ms
+    maxIdleTimeMS=30000,     # Drop idle sockets; each one holds server RAM
+    waitQueueTimeoutMS=2500, # Surface pool exhaustion instead of queueing forever
     retryWrites=True
 )
 
@@ -62,36 +77,107 @@ quiz_attempts_collection = database["quiz_attempts"] # [NEW] Granular History
 
 # Progress Tracking
 progress_collection = database["user_progress"]
+# Per-video watch state, one small doc per (user, video). Kept out of the
+# user_progress document so updates touch a single doc and the progress
+# doc stops growing with every video watched
+# (migrations/migrate_video_progress.py moves legacy embedded data over).
+video_progress_collection = database["video_progress"]
 
 # Video & Notes
 videos_collection = database["videos"]
 notes_collection = database["notes"]
 
+# ============================================================================
+# INDEXES
+# ============================================================================
+
+async def _ensure_index(collection, keys, **kwargs):
+    """
+    Creates one index, logging instead of raising on failure so one bad
+    index (e.g. a unique constraint violated by legacy data) doesn't stop
+    the remaining indexes from being created.
+    """
+    try:
+        await collection.create_index(keys, **kwargs)
+    except Exception as e:
+        logger.warning("Could not create index %s on %s: %s",
+                       keys, collection.name, e)
+
+
+async def ensure_indexes():
+    """
+    Creates the indexes backing the exact query shapes used by the helpers
+    below. Without them Atlas falls back to collection scans. Called from
+    app startup; create_index is a no-op when the index already exists,
+    and each index is attempted independently.
+    """
+    await _ensure_index(user_collection, "email", unique=True)
+    await _ensure_index(user_collection, "google_id", sparse=True)
+    await _ensure_index(questions_collection, "topic_id")
+    # Legacy topic-name lookups are case-insensitive; a strength-2
+    # collation index lets the server match without a regex scan
+    await _ensure_index(
+        questions_collection, "topic",
+        collation=Collation(locale="en", strength=2)
+    )
+    await _ensure_index(topics_collection, [("type", 1), ("parent_id", 1)])
+    # Every progress helper filters on user_id; one doc per user
+    await _ensure_index(progress_collection, "user_id", unique=True)
+    # One doc per (user, video); the compound index also serves the
+    # user_id-only dashboard range query
+    await _ensure_index(
+        video_progress_collection, [("user_id", 1), ("video_id", 1)], unique=True
+    )
+    # Notes are a global cache upserted by video_id (one doc per video);
+    # history sorts newest-first. The unique constraint can fail on legacy
+    # data with duplicate video_id docs - the history endpoint dedups for
+    # exactly that reason - which is why failures here must not cascade.
+    await _ensure_index(notes_collection, "video_id", unique=True)
+    await _ensure_index(notes_collection, [("generated_at", -1)])
+    # Content-addressed dedup key; sparse because older docs lack it
+    await _ensure_index(notes_collection, "transcript_hash", sparse=True)
+    # Plain topic index for the legacy distinct()/$match paths, which
+    # don't run under the collation above
+    await _ensure_index(questions_collection, "topic", name="topic_plain")
+    # Canvas notes: one doc per (user, video) so the save upsert is an
+    # index seek; the second index covers the sidebar listing's
+    # user_id filter + updated_at desc sort
+    await _ensure_index(
+        database["user_canvas_notes"], [("user_id", 1), ("video_id", 1)],
+        unique=True
+    )
+    await _ensure_index(
+        database["user_canvas_notes"], [("user_id", 1), ("updated_at", -1)]
+    )
+    logger.info("Indexes ensured")
+
+
 # ============================================================================
 # CONNECTION HELPERS
 # ============================================================================
 
-def is_db_connected() -> bool:
+async def is_db_connected() -> bool:
     """
     Checks if the MongoDB connection is active.
     Returns True if connected, False otherwise.
     """
     try:
-        client.admin.command('ping')
+        await client.admin.command('ping')
         return True
     except Exception:
         return False
 
 
-def get_db_info() -> dict:
+async def get_db_info() -> dict:
     """
     Returns information about the current database connection.
     Useful for debugging and health checks.
     """
+    connected = await is_db_connected()
     return {
-        "connected": is_db_connected(),
+        "connected": connected,
         "database": DATABASE_NAME,
-        "collections": database.list_collection_names() if is_db_connected() else []
+        "collections": await database.list_collection_names() if connected else []
     }
 
 
@@ -120,7 +206,7 @@ async def get_user_by_email(email: str):
     Retrieves a user from the database by their email address.
     Returns cleaned user data (no sensitive fields).
     """
-    user = user_collection.find_one({"email": email})
+    user = await user_collection.find_one({"email": email})
     return user_helper(user) if user else None
 
 
@@ -129,14 +215,14 @@ async def get_user_by_email_raw(email: str):
     Retrieves the RAW user document including hashed_password.
     Used for authentication only - do not expose to API.
     """
-    return user_collection.find_one({"email": email})
+    return await user_collection.find_one({"email": email})
 
 
 async def get_user_by_google_id(google_id: str):
     """
     Retrieves a user from the database by their Google ID.
     """
-    user = user_collection.find_one({"google_id": google_id})
+    user = await user_collection.find_one({"google_id": google_id})
     return user_helper(user) if user else None
 
 
@@ -144,8 +230,8 @@ async def create_user(user_data: dict):
     """
     Creates a new user in the database.
     """
-    result = user_collection.insert_one(user_data)
-    new_user = user_collection.find_one({"_id": result.inserted_id})
+    result = await user_collection.insert_one(user_data)
+    new_user = await user_collection.find_one({"_id": result.inserted_id})
     return user_helper(new_user)
 
 
@@ -153,45 +239,92 @@ async def create_user(user_data: dict):
 # QUIZ HELPERS (Two-Collection System)
 # ============================================================================
 
+# The hierarchy only changes when an admin/migration touches topics or
+# questions, but /quiz/topics is hit on every dashboard load. Cache the
+# built structure for a few minutes so the hot path skips the DB entirely.
+_HIERARCHY_TTL_SECONDS = 300
+_hierarchy_cache = {"built_at": 0.0, "data": None}
+
+# Individual topic docs are fetched by both /quiz/start and /quiz/submit
+# for every quiz; same churn profile as the hierarchy, so same TTL.
+_TOPIC_TTL_SECONDS = 300
+_TOPIC_CACHE_MAX = 1000
+_topic_cache = OrderedDict()
+
+
+def invalidate_topics_cache():
+    """
+    Drops the cached topic hierarchy and per-topic documents.
+    Call after any mutation of topics/questions so the next fetch rebuilds.
+    """
+    _hierarchy_cache["data"] = None
+    _topic_cache.clear()
+
+
 async def get_topics_hierarchy():
     """
     Returns the full topic hierarchy for building the quiz menu.
     Structure: { subjects: [{_id, name, topics: [{_id, name}]}] }
+    Cached in-process for _HIERARCHY_TTL_SECONDS.
     """
-    print("\n[Database] 📂 FETCHING TOPIC HIERARCHY")
-    
+    if (_hierarchy_cache["data"] is not None
+            and time.monotonic() - _hierarchy_cache["built_at"] < _HIERARCHY_TTL_SECONDS):
+        return _hierarchy_cache["data"]
+
+    logger.debug("Fetching topic hierarchy")
+
     # Get all subjects (type == SUBJECT)
-    subjects = list(topics_collection.find({"type": "SUBJECT"}))
-    print(f"  - Found {len(subjects)} subjects")
-    
+    subjects = await topics_collection.find({"type": "SUBJECT"}).to_list(None)
+    logger.debug("Found %d subjects", len(subjects))
+
+    # Issue the per-subject topic queries concurrently instead of one
+    # sequential round-trip per subject
+    topic_lists = await asyncio.gather(*[
+        topics_collection.find({
+            "type": "TOPIC",
+            "parent_id": subject["_id"]
+        }).to_list(None)
+        for subject in subjects
+    ])
+
+    # Question counts are denormalized onto the topic documents
+    # (migrations/backfill_question_counts.py). Reading a field is O(1) vs.
+    # an index scan per topic on every menu load. Live-count only topics
+    # that haven't been backfilled yet, concurrently.
+    all_topics = [topic for topics in topic_lists for topic in topics]
+    missing = [topic for topic in all_topics if "question_count" not in topic]
+    if missing:
+        counts = await asyncio.gather(*[
+            questions_collection.count_documents({"topic_id": topic["_id"]})
+            for topic in missing
+        ])
+        for topic, count in zip(missing, counts):
+            topic["question_count"] = count
+    count_by_topic_id = {topic["_id"]: topic["question_count"] for topic in all_topics}
+
     hierarchy = []
-    for subject in subjects:
+    for subject, child_topics in zip(subjects, topic_lists):
         subject_data = {
             "_id": subject["_id"],
             "name": subject["name"],
             "icon": subject.get("icon", "📚"),
-            "topics": []
+            "topics": [
+                {
+                    "_id": topic["_id"],
+                    "name": topic["name"],
+                    "icon": topic.get("icon", "📄"),
+                    "question_count": count_by_topic_id[topic["_id"]]
+                }
+                for topic in child_topics
+            ]
         }
-        
-        # Get child topics
-        child_topics = list(topics_collection.find({
-            "type": "TOPIC",
-            "parent_id": subject["_id"]
-        }))
-        
-        for topic in child_topics:
-            # Count questions for each topic
-            question_count = questions_collection.count_documents({"topic_id": topic["_id"]})
-            subject_data["topics"].append({
-                "_id": topic["_id"],
-                "name": topic["name"],
-                "icon": topic.get("icon", "📄"),
-                "question_count": question_count
-            })
-        
-        print(f"  - {subject['name']}: {len(child_topics)} topics")
+
+        logger.debug("%s: %d topics", subject["name"], len(child_topics))
         hierarchy.append(subject_data)
-    
+
+    _hierarchy_cache["data"] = hierarchy
+    _hierarchy_cache["built_at"] = time.monotonic()
+
     return hierarchy
 
 
@@ -200,31 +333,67 @@ async def get_random_questions_by_topic_id(topic_id: str, count: int = 10):
     Gets random questions for a specific topic_id using MongoDB aggregation.
     This is the core function for quiz generation.
     """
-    print(f"\n[Database] 🎲 FETCHING RANDOM QUESTIONS")
-    print(f"  - Topic ID: {topic_id}")
-    print(f"  - Requested Count: {count}")
-    
-    pipeline = [
-        {"$match": {"topic_id": topic_id}},
-        {"$sample": {"size": count}}
-    ]
-    
-    questions = list(questions_collection.aggregate(pipeline))
-    print(f"  - Retrieved: {len(questions)} questions")
-    
-    # Log question pillars for debugging
-    pillars = [q.get("diagnosis_pillar", "Unknown") for q in questions]
-    pillar_counts = {p: pillars.count(p) for p in set(pillars)}
-    print(f"  - Pillar Distribution: {pillar_counts}")
-    
+    logger.debug("Fetching %d random questions for topic %s", count, topic_id)
+
+    # Preferred path: sample from the denormalized id list on the topic
+    # document (migrations/backfill_question_ids.py) and fetch only the
+    # chosen docs by _id. One indexed lookup returning K questions instead
+    # of a server-side $match + $sample over the whole topic.
+    topic = await topics_collection.find_one({"_id": topic_id}, {"question_ids": 1})
+    question_ids = (topic or {}).get("question_ids")
+
+    # Never ship answer keys to the quiz-start path; the submit handler
+    # re-fetches the grading fields itself
+    quiz_projection = {"correct_option_id": 0, "explanation": 0}
+
+    if question_ids:
+        chosen = random.sample(question_ids, k=min(count, len(question_ids)))
+        questions = await questions_collection.find(
+            {"_id": {"$in": chosen}}, quiz_projection
+        ).to_list(length=count)
+    else:
+        # Fallback for topics without a backfilled id list. No hint: the
+        # planner picks the topic_id index on its own when it exists, and
+        # a hinted query hard-fails if index creation was ever skipped.
+        pipeline = [
+            {"$match": {"topic_id": topic_id}},
+            {"$sample": {"size": count}},
+            {"$project": quiz_projection}
+        ]
+        questions = await questions_collection.aggregate(
+            pipeline
+        ).to_list(length=count)
+
+    logger.debug("Retrieved %d questions", len(questions))
+
+    # Log question pillars for debugging - guard the whole computation so
+    # the per-question pass is skipped entirely when DEBUG is off
+    if logger.isEnabledFor(logging.DEBUG):
+        pillar_counts = Counter(q.get("diagnosis_pillar", "Unknown") for q in questions)
+        logger.debug("Pillar distribution: %s", dict(pillar_counts))
+
     return questions
 
 
 async def get_topic_by_id(topic_id: str):
     """
     Retrieves a single topic by its ID.
+    Cached in-process for _TOPIC_TTL_SECONDS (LRU, bounded).
     """
-    return topics_collection.find_one({"_id": topic_id})
+    cached = _topic_cache.get(topic_id)
+    if cached is not None:
+        fetched_at, topic = cached
+        if time.monotonic() - fetched_at < _TOPIC_TTL_SECONDS:
+            _topic_cache.move_to_end(topic_id)
+            return topic
+        del _topic_cache[topic_id]
+
+    topic = await topics_collection.find_one({"_id": topic_id})
+    if topic is not None:
+        _topic_cache[topic_id] = (time.monotonic(), topic)
+        if len(_topic_cache) > _TOPIC_CACHE_MAX:
+            _topic_cache.popitem(last=False)
+    return topic
 
 
 async def get_all_quiz_topics():
@@ -232,20 +401,25 @@ async def get_all_quiz_topics():
     [LEGACY] Retrieves all unique quiz topics from the questions collection.
     Kept for backward compatibility.
     """
-    topics = questions_collection.distinct("topic")
+    topics = await questions_collection.distinct("topic")
     return topics
 
 
+# Case-insensitive exact match via the strength-2 collation index created
+# in ensure_indexes(). Built once: the old anchored $regex forced a
+# collection scan and rebuilt the pattern on every call.
+_CASE_INSENSITIVE = Collation(locale="en", strength=2)
+
+
 async def get_questions_by_topic(topic: str, limit: int = 10):
     """
     [LEGACY] Retrieves questions for a specific topic name (case-insensitive).
     Kept for backward compatibility.
     """
-    import re
     cursor = questions_collection.find(
-        {"topic": {"$regex": f"^{re.escape(topic)}$", "$options": "i"}}
-    ).limit(limit)
-    return list(cursor)
+        {"topic": topic}
+    ).collation(_CASE_INSENSITIVE).limit(limit)
+    return await cursor.to_list(length=limit)
 
 
 async def get_random_questions(topic: str, count: int = 5):
@@ -257,7 +431,7 @@ async def get_random_questions(topic: str, count: int = 5):
         {"$match": {"topic": topic}},
         {"$sample": {"size": count}}
     ]
-    return list(questions_collection.aggregate(pipeline))
+    return await questions_collection.aggregate(pipeline).to_list(length=count)
 
 
 # ============================================================================
@@ -266,64 +440,177 @@ async def get_random_questions(topic: str, count: int = 5):
 
 async def get_or_create_user_progress(user_id: str):
     """
-    Retrieves a user's progress document or creates a new one.
+    Retrieves a user's progress document, creating it atomically on first
+    access. A single find_one_and_update round-trip replaces the old
+    find + insert + refetch sequence (which could also race under
+    concurrent first requests).
     """
-    progress = progress_collection.find_one({"user_id": user_id})
-    
-    if not progress:
-        # Create new progress document with default values
-        new_progress = {
+    return await progress_collection.find_one_and_update(
+        {"user_id": user_id},
+        {"$setOnInsert": {
             "user_id": user_id,
-            "videos": {},
             "quizzes": [],
             "streak": 0,
             "longest_streak": 0,
             "total_watch_time": 0,
             "total_quizzes_taken": 0
+        }},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+# Dashboard summaries change only when the user records progress, but the
+# dashboard polls on every page load. A short per-user TTL absorbs repeat
+# reads; writes below invalidate so fresh results never lag a mutation.
+_DASHBOARD_TTL_SECONDS = 60
+_DASHBOARD_CACHE_MAX = 10000
+_dashboard_cache = OrderedDict()  # user_id -> (built_at, summary)
+
+
+def invalidate_dashboard_cache(user_id: str):
+    """Drops the cached dashboard summary after a progress write."""
+    _dashboard_cache.pop(user_id, None)
+
+
+async def get_dashboard_summary(user_id: str):
+    """
+    Returns the dashboard scalars (quiz avg/max/min, streaks, learning
+    progress) plus a trimmed videos list in a single aggregation.
+    The reductions run server-side, so the full quizzes array never
+    crosses the wire - only four numbers do.
+    Returns None when the user has no progress document yet.
+    """
+    cached = _dashboard_cache.get(user_id)
+    if cached and time.monotonic() - cached[0] < _DASHBOARD_TTL_SECONDS:
+        _dashboard_cache.move_to_end(user_id)
+        return cached[1]
+
+    pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$project": {
+            "_id": 0,
+            "streak": 1,
+            "longest_streak": 1,
+            "quiz_count": {"$size": {"$ifNull": ["$quizzes", []]}},
+            "quiz_avg": {"$avg": "$quizzes.percentage"},
+            "quiz_max": {"$max": "$quizzes.percentage"},
+            "quiz_min": {"$min": "$quizzes.percentage"}
+        }}
+    ]
+    results, videos = await asyncio.gather(
+        progress_collection.aggregate(pipeline).to_list(length=1),
+        video_progress_collection.find(
+            {"user_id": user_id},
+            {"_id": 0, "video_id": 1, "title": 1, "category": 1,
+             "instructor": 1, "watch_percentage": 1}
+        ).to_list(None)
+    )
+
+    if not results and not videos:
+        summary = None
+    else:
+        summary = results[0] if results else {
+            "streak": 0, "longest_streak": 0, "quiz_count": 0,
+            "quiz_avg": None, "quiz_max": None, "quiz_min": None
         }
-        progress_collection.insert_one(new_progress)
-        return new_progress
-    
-    return progress
+        summary["videos"] = videos
+        progresses = [v.get("watch_percentage", 0) for v in videos]
+        summary["learning_progress"] = (
+            sum(progresses) / len(progresses) if progresses else None
+        )
+
+    if summary is not None:
+        _dashboard_cache[user_id] = (time.monotonic(), summary)
+        _dashboard_cache.move_to_end(user_id)
+        if len(_dashboard_cache) > _DASHBOARD_CACHE_MAX:
+            _dashboard_cache.popitem(last=False)
+
+    return summary
 
 
 async def update_video_progress(user_id: str, video_id: str, progress_data: dict):
     """
     Updates the progress for a specific video.
+    One small (user, video) doc is touched instead of rewriting a field
+    path inside the ever-growing user progress document.
     """
-    progress_collection.update_one(
-        {"user_id": user_id},
-        {"$set": {f"videos.{video_id}": progress_data}},
+    await video_progress_collection.update_one(
+        {"user_id": user_id, "video_id": video_id},
+        {"$set": progress_data},
         upsert=True
     )
+    invalidate_dashboard_cache(user_id)
+
+
+async def bulk_update_video_progress(user_id: str, updates: dict):
+    """
+    Applies {video_id: progress_data} updates in one bulk_write round-trip.
+    """
+    if not updates:
+        return
+    requests = [
+        UpdateOne(
+            {"user_id": user_id, "video_id": video_id},
+            {"$set": progress_data},
+            upsert=True
+        )
+        for video_id, progress_data in updates.items()
+    ]
+    await video_progress_collection.bulk_write(requests, ordered=False)
+    invalidate_dashboard_cache(user_id)
+
+
+# The embedded quizzes array only feeds dashboard stats, so keep just the
+# most recent results - unbounded $push grows the document forever (toward
+# the 16MB BSON cap) and every fetch pays for the full history. The
+# complete per-question record lives in quiz_attempts_collection.
+QUIZ_HISTORY_LIMIT = 100
 
 
 async def add_quiz_result(user_id: str, quiz_result: dict):
     """
-    Appends a new quiz result to the user's progress.
+    Appends a new quiz result to the user's progress, keeping only the
+    newest QUIZ_HISTORY_LIMIT entries.
     """
-    progress_collection.update_one(
+    await progress_collection.update_one(
         {"user_id": user_id},
         {
-            "$push": {"quizzes": quiz_result},
+            "$push": {"quizzes": {"$each": [quiz_result], "$slice": -QUIZ_HISTORY_LIMIT}},
             "$inc": {"total_quizzes_taken": 1}
         },
         upsert=True
     )
+    invalidate_dashboard_cache(user_id)
+
+
+async def bulk_update_progress(user_id: str, ops: list):
+    """
+    Applies a batch of progress updates in a single round-trip.
+    Each op is a raw Mongo update document ({"$set": ...}, {"$push": ...}).
+    ordered=False lets the server apply them in parallel instead of
+    serializing one network RTT per update.
+    """
+    if not ops:
+        return
+    requests = [UpdateOne({"user_id": user_id}, op, upsert=True) for op in ops]
+    await progress_collection.bulk_write(requests, ordered=False)
+    invalidate_dashboard_cache(user_id)
 
 
 async def update_streak(user_id: str, new_streak: int):
     """
     Updates the user's streak and longest streak.
+    $max keeps the larger of the stored and new value atomically on the
+    server - one round-trip, no need to fetch the whole progress doc
+    just to compare one int.
     """
-    progress = progress_collection.find_one({"user_id": user_id})
-    longest = max(new_streak, progress.get("longest_streak", 0)) if progress else new_streak
-    
-    progress_collection.update_one(
+    await progress_collection.update_one(
         {"user_id": user_id},
-        {"$set": {"streak": new_streak, "longest_streak": longest}},
+        {"$set": {"streak": new_streak}, "$max": {"longest_streak": new_streak}},
         upsert=True
     )
+    invalidate_dashboard_cache(user_id)
 
 
 # ============================================================================
@@ -332,6 +619,9 @@ async def update_streak(user_id: str, new_streak: int):
 
 if __name__ == "__main__":
     # Quick connection test when running directly
-    print(f"Database: {DATABASE_NAME}")
-    print(f"Connected: {is_db_connected()}")
-    print(f"Collections: {database.list_collection_names()}")
+    import asyncio
+
+    info = asyncio.run(get_db_info())
+    print(f"Database: {info['database']}")
+    print(f"Connected: {info['connected']}")
+    print(f"Collections: {info['collections']}")
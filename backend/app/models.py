@@ -9,7 +9,7 @@ This module defines Pydantic models for:
 - Quiz Submission & Analysis
 """
 
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 from typing import Optional, List
 from enum import Enum
 
@@ -62,8 +62,9 @@ class Topic(BaseModel):
     icon: Optional[str] = "📚"       # Emoji/icon for UI
     description: Optional[str] = None
 
-    class Config:
-        populate_by_name = True
+    # extra="ignore" skips unknown-field bookkeeping when validating
+    # raw Mongo documents
+    model_config = ConfigDict(populate_by_name=True, extra="ignore")
 
 
 # ============================================================================
@@ -92,9 +93,8 @@ class Question(BaseModel):
     
     # Optional metadata
     difficulty: Optional[str] = "Medium"       # Easy/Medium/Hard
-    
-    class Config:
-        populate_by_name = True
+
+    model_config = ConfigDict(populate_by_name=True, extra="ignore")
 
 
 # ============================================================================
@@ -107,6 +107,10 @@ class QuestionAnswer(BaseModel):
     selected_option_id: str       # User's selected option ("A", "B", etc.)
     time_taken_seconds: int       # Time spent on this question
 
+    # Inbound payloads are read-only: frozen skips __dict__ mutation
+    # support and extra="ignore" skips unknown-field bookkeeping
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
 
 class QuizSubmission(BaseModel):
     """Complete quiz submission from frontend"""
@@ -114,6 +118,8 @@ class QuizSubmission(BaseModel):
     answers: List[QuestionAnswer]         # List of answers with timing
     total_time_seconds: int               # Total quiz time
 
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
 
 # ============================================================================
 # DIAGNOSIS MODELS (Output)
@@ -11,7 +11,10 @@ Architecture: Chunking & Stitching (Divide and Conquer)
 Author: AI Engineering Team
 """
 
-import time
+import asyncio
+import bisect
+import logging
+import random
 import google.generativeai as genai
 from typing import List, Tuple, Optional
 import os
@@ -19,15 +22,63 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Static task rules + example, identical for every chunk. Baked into the
+# model as system_instruction once instead of being resent inside each
+# prompt - per-chunk input tokens drop to roughly the chunk text itself.
+CHUNK_INSTRUCTION = """You are a senior Computer Science student creating STUDY NOTES from a lecture recording.
+
+YOUR TASK: Transform each lecture transcript you are given into PROPER STUDY NOTES that a student would use to revise.
+
+FORMAT RULES:
+1. For each topic/concept mentioned, write:
+   - **Topic Name** as a heading (## or ###)
+   - A clear 1-2 sentence DEFINITION/EXPLANATION
+   - Key points as bullets
+
+2. If code is discussed:
+   - Write the actual code in a proper code block
+   - Add a brief explanation of what it does
+
+3. If examples are given:
+   - Include them with clear context
+
+4. DO NOT:
+   - Copy transcript word-for-word
+   - Include filler words, "um", "like", YouTuber commentary
+   - Write long paragraphs - use bullets for clarity
+
+5. WRITE LIKE COLLEGE NOTES:
+   - Clean, organized, easy to scan
+   - Definitions should be concise and accurate
+   - Each concept should be understandable on its own
+
+EXAMPLE FORMAT:
+## Arrays
+A data structure that stores elements of the same type in contiguous memory locations.
+
+- Fixed size (declared at creation)
+- O(1) access time using index
+- Memory efficient for sequential data
+
+```python
+arr = [1, 2, 3, 4, 5]
+print(arr[0])  # Output: 1
+```
+"""
+
 # Configure Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if GEMINI_API_KEY:
     genai.configure(api_key=GEMINI_API_KEY)
-    model = genai.GenerativeModel('gemini-2.5-flash')
-    print("[NoteGenerationService] ✅ Gemini configured")
+    model = genai.GenerativeModel(
+        'gemini-2.5-flash', system_instruction=CHUNK_INSTRUCTION
+    )
+    logger.info("Gemini configured")
 else:
     model = None
-    print("[NoteGenerationService] ⚠️ GEMINI_API_KEY not found")
+    logger.warning("GEMINI_API_KEY not found")
 
 
 class NoteGenerationService:
@@ -39,7 +90,8 @@ class NoteGenerationService:
     # Configuration
     CHUNK_SIZE = 25000  # ~15 minutes of video content
     CHUNK_OVERLAP = 500  # Overlap to maintain context continuity
-    RATE_LIMIT_DELAY = 1.5  # Seconds between API calls
+    RATE_LIMIT_DELAY = 1.5  # Max jittered stagger before each API call
+    MAX_CONCURRENCY = 5  # In-flight Gemini calls (respects RPM limits)
     
     def __init__(self, topic: str, video_title: str):
         self.topic = topic
@@ -57,17 +109,25 @@ class NoteGenerationService:
         chunks = []
         start = 0
         transcript_length = len(transcript)
-        
+
+        # Index every sentence boundary in one pass up front, then bisect
+        # per chunk instead of re-scanning the tail of each window with rfind
+        sentence_ends = []
+        pos = transcript.find('. ')
+        while pos != -1:
+            sentence_ends.append(pos)
+            pos = transcript.find('. ', pos + 1)
+
         while start < transcript_length:
             end = start + self.CHUNK_SIZE
-            
+
             # Find a good break point (end of sentence) if possible
             if end < transcript_length:
-                # Look for sentence ending within last 500 chars of chunk
-                break_point = transcript.rfind('. ', end - 500, end)
-                if break_point != -1:
-                    end = break_point + 1
-            
+                # Latest sentence ending within the last 500 chars of the chunk
+                idx = bisect.bisect_right(sentence_ends, end - 1)
+                if idx and sentence_ends[idx - 1] >= end - 500:
+                    end = sentence_ends[idx - 1] + 1
+
             chunk = transcript[start:end]
             chunks.append(chunk.strip())
             
@@ -75,63 +135,24 @@ class NoteGenerationService:
             start = end - self.CHUNK_OVERLAP
         
         self.chunks = chunks
-        print(f"[NoteGenerationService] 📦 Split transcript into {len(chunks)} chunks")
+        logger.debug("Split transcript into %d chunks", len(chunks))
         return chunks
     
     def _build_chunk_prompt(self, chunk_text: str, chunk_index: int, total_chunks: int) -> str:
         """
-        Build prompt for college-level study notes from transcript.
+        Build the per-chunk prompt: just the transcript segment - the
+        format rules live in the model's system_instruction.
         """
-        return f"""You are a senior Computer Science student creating STUDY NOTES from a lecture recording.
-
-=== LECTURE TRANSCRIPT (Part {chunk_index + 1}/{total_chunks}) ===
+        return f"""=== LECTURE TRANSCRIPT (Part {chunk_index + 1}/{total_chunks}) ===
 {chunk_text}
 === END TRANSCRIPT ===
 
-YOUR TASK: Transform this lecture transcript into PROPER STUDY NOTES that a student would use to revise.
-
-FORMAT RULES:
-1. For each topic/concept mentioned, write:
-   - **Topic Name** as a heading (## or ###)
-   - A clear 1-2 sentence DEFINITION/EXPLANATION
-   - Key points as bullets
-
-2. If code is discussed:
-   - Write the actual code in a proper code block
-   - Add a brief explanation of what it does
-
-3. If examples are given:
-   - Include them with clear context
-
-4. DO NOT:
-   - Copy transcript word-for-word
-   - Include filler words, "um", "like", YouTuber commentary
-   - Write long paragraphs - use bullets for clarity
-
-5. WRITE LIKE COLLEGE NOTES:
-   - Clean, organized, easy to scan
-   - Definitions should be concise and accurate
-   - Each concept should be understandable on its own
-
-EXAMPLE FORMAT:
-## Arrays
-A data structure that stores elements of the same type in contiguous memory locations.
-
-- Fixed size (declared at creation)
-- O(1) access time using index
-- Memory efficient for sequential data
-
-```python
-arr = [1, 2, 3, 4, 5]
-print(arr[0])  # Output: 1
-```
-
 NOW WRITE YOUR NOTES:"""
 
-    def _generate_chunk_notes(self, chunk_text: str, chunk_index: int, total_chunks: int) -> Optional[str]:
+    async def _generate_chunk_notes(self, chunk_text: str, chunk_index: int, total_chunks: int) -> Optional[str]:
         """
         Send a single chunk to Gemini and get detailed notes.
-        Includes error handling and rate limiting.
+        Includes error handling.
         """
         if not model:
             return f"<!-- Error: Gemini not configured for chunk {chunk_index + 1} -->"
@@ -139,28 +160,26 @@ NOW WRITE YOUR NOTES:"""
         prompt = self._build_chunk_prompt(chunk_text, chunk_index, total_chunks)
         
         try:
-            response = model.generate_content(prompt)
+            response = await model.generate_content_async(prompt)
             notes = response.text
-            print(f"  ✅ Chunk {chunk_index + 1}/{total_chunks}: Generated {len(notes)} chars")
+            logger.info("Chunk %d/%d: generated %d chars", chunk_index + 1, total_chunks, len(notes))
             return notes
             
         except Exception as e:
             error_msg = f"<!-- Error processing chunk {chunk_index + 1}: {str(e)} -->"
-            print(f"  ❌ Chunk {chunk_index + 1}/{total_chunks}: FAILED - {str(e)}")
+            logger.warning("Chunk %d/%d failed: %s", chunk_index + 1, total_chunks, e)
             self.failed_chunks.append(chunk_index + 1)
             return error_msg
     
-    def generate_full_notes(self, transcript: str) -> Tuple[str, dict]:
+    async def generate_full_notes(self, transcript: str) -> Tuple[str, dict]:
         """
         Main entry point: Generate complete notes from full transcript.
         
         Returns:
             Tuple of (master_notes_markdown, metadata_dict)
         """
-        print(f"\n{'='*60}")
-        print(f"[NoteGenerationService] 📝 STARTING FULL NOTES GENERATION")
-        print(f"  - Topic: {self.topic}")
-        print(f"  - Transcript Length: {len(transcript)} chars")
+        logger.info("Starting full notes generation: topic=%s transcript=%d chars",
+                    self.topic, len(transcript))
         
         # Step 1: Chunk the transcript
         chunks = self.chunk_transcript(transcript)
@@ -172,25 +191,34 @@ NOW WRITE YOUR NOTES:"""
         # Start with clean notes (no metadata header)
         self.master_notes = ""
         
-        # Step 3: Loop through chunks with rate limiting
-        print(f"\n[NoteGenerationService] 🔄 Processing {total_chunks} chunks...")
+        # Step 3: Fan chunks out concurrently - they are independent, and
+        # LLM latency dominates, so wall-clock shrinks from N * latency to
+        # roughly (N / MAX_CONCURRENCY) * latency. A bounded semaphore plus
+        # a jittered stagger keeps the request rate under Gemini's RPM cap.
+        logger.info("Processing %d chunks...", total_chunks)
         
-        for i, chunk in enumerate(chunks):
-            # Generate notes for this chunk
-            chunk_notes = self._generate_chunk_notes(chunk, i, total_chunks)
-            
-            # Append notes directly (no section dividers for cleaner output)
-            if chunk_notes and "[No educational content" not in chunk_notes:
-                self.master_notes += chunk_notes + "\n\n"
-            
-            # Rate limiting (skip on last chunk)
-            if i < total_chunks - 1:
-                time.sleep(self.RATE_LIMIT_DELAY)
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENCY)
+        
+        async def process_chunk(i: int, chunk: str) -> Optional[str]:
+            async with semaphore:
+                await asyncio.sleep(self.RATE_LIMIT_DELAY * random.random())
+                return await self._generate_chunk_notes(chunk, i, total_chunks)
+        
+        results = await asyncio.gather(
+            *[process_chunk(i, chunk) for i, chunk in enumerate(chunks)]
+        )
+        
+        # Stitch in original order (gather preserves input ordering).
+        # Collect into a list and join once - repeated += on an attribute
+        # string re-copies the whole accumulated text every iteration.
+        parts = [
+            chunk_notes for chunk_notes in results
+            if chunk_notes and "[No educational content" not in chunk_notes
+        ]
+        self.master_notes = "\n\n".join(parts) + ("\n\n" if parts else "")
         
-        print(f"\n[NoteGenerationService] ✅ COMPLETE")
-        print(f"  - Total Output: {len(self.master_notes)} chars")
-        print(f"  - Failed Chunks: {len(self.failed_chunks)}")
-        print(f"{'='*60}\n")
+        logger.info("Notes generation complete: %d chars, %d failed chunks",
+                    len(self.master_notes), len(self.failed_chunks))
         
         # Return notes and metadata
         metadata = {
@@ -204,9 +232,9 @@ NOW WRITE YOUR NOTES:"""
 
 
 # Convenience function for API usage
-def generate_comprehensive_notes(topic: str, video_title: str, transcript: str) -> Tuple[str, dict]:
+async def generate_comprehensive_notes(topic: str, video_title: str, transcript: str) -> Tuple[str, dict]:
     """
     Convenience wrapper for the NoteGenerationService.
     """
     service = NoteGenerationService(topic, video_title)
-    return service.generate_full_notes(transcript)
+    return await service.generate_full_notes(transcript)
@@ -9,7 +9,13 @@ This saves API calls - if notes exist for a video, any user can retrieve them.
 User's personal handwritten notes are stored separately in user_notes.py.
 """
 
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
 from datetime import datetime
@@ -18,7 +24,7 @@ from .note_generation_service import generate_comprehensive_notes
 from .database import notes_collection, is_db_connected
 from .auth import get_current_user
 
-print("[Notes Module] ✅ Notes router loaded (Global Caching)")
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -39,53 +45,110 @@ class NoteResponse(BaseModel):
 # CACHING HELPERS - GLOBAL (by video_id only, shared across users)
 # ============================================================================
 
-def get_cached_notes(video_id: str) -> Optional[dict]:
+# In-process L1 in front of Mongo: generated notes are effectively
+# immutable, so repeat reads of a popular video shouldn't pay the DB
+# round-trip. Bounded LRU because markdown bodies can be large.
+_MEMORY_TTL_SECONDS = 86400
+_MEMORY_CACHE_MAX = 256
+_memory_cache = OrderedDict()  # video_id -> (cached_at, doc)
+
+
+def _memory_get(video_id: str) -> Optional[dict]:
+    entry = _memory_cache.get(video_id)
+    if entry and time.monotonic() - entry[0] < _MEMORY_TTL_SECONDS:
+        _memory_cache.move_to_end(video_id)
+        return entry[1]
+    return None
+
+
+def _memory_put(video_id: str, doc: dict):
+    _memory_cache[video_id] = (time.monotonic(), doc)
+    _memory_cache.move_to_end(video_id)
+    if len(_memory_cache) > _MEMORY_CACHE_MAX:
+        _memory_cache.popitem(last=False)
+
+
+async def get_cached_notes(video_id: str) -> Optional[dict]:
     """
-    Retrieve cached AI-generated notes from MongoDB.
+    Retrieve cached AI-generated notes (in-process LRU, then MongoDB).
     Notes are cached globally by video_id (same notes for all users).
     """
-    if not is_db_connected():
+    hit = _memory_get(video_id)
+    if hit:
+        logger.debug("Memory cache hit for video %s", video_id)
+        return hit
+
+    if not await is_db_connected():
         return None
-    
+
     try:
-        cached = notes_collection.find_one({"video_id": video_id})
+        cached = await notes_collection.find_one({"video_id": video_id})
         if cached:
-            print(f"  - 📦 Cache HIT for video: {video_id}")
+            logger.debug("Cache hit for video %s", video_id)
+            _memory_put(video_id, cached)
             return cached
-        print(f"  - 🔍 Cache MISS for video: {video_id}")
+        logger.debug("Cache miss for video %s", video_id)
         return None
     except Exception as e:
-        print(f"  - ⚠️ Cache lookup error: {e}")
+        logger.warning("Cache lookup error: %s", e)
         return None
 
 
-def save_notes_to_cache(video_id: str, topic: str, video_title: str, markdown: str, metadata: dict):
+def _transcript_hash(transcript: str) -> str:
+    """Content key for a transcript - microseconds vs a multi-second LLM run."""
+    return hashlib.sha256(transcript.encode()).hexdigest()
+
+
+async def get_notes_by_transcript_hash(transcript_hash: str) -> Optional[dict]:
+    """
+    Secondary cache lookup: notes generated for an identical transcript
+    under a different video_id (mirrors, re-uploads).
+    """
+    if not await is_db_connected():
+        return None
+    try:
+        return await notes_collection.find_one({"transcript_hash": transcript_hash})
+    except Exception as e:
+        logger.warning("Hash lookup error: %s", e)
+        return None
+
+
+async def save_notes_to_cache(video_id: str, topic: str, video_title: str, markdown: str,
+                              metadata: dict, transcript_hash: Optional[str] = None):
     """
     Save AI-generated notes to MongoDB (global cache by video_id).
+    transcript_hash enables content-level dedup across video_ids.
     """
-    if not is_db_connected():
-        print(f"  - ⚠️ DB not connected, skipping cache save")
+    # Drop any stale in-memory copy so the next read sees the new notes
+    _memory_cache.pop(video_id, None)
+
+    if not await is_db_connected():
+        logger.warning("DB not connected, skipping cache save")
         return
-    
+
     try:
-        notes_collection.update_one(
+        doc = {
+            "video_id": video_id,
+            "topic": topic,
+            "video_title": video_title,
+            "markdown": markdown,
+            "metadata": metadata,
+            "generated_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }
+        if transcript_hash:
+            doc["transcript_hash"] = transcript_hash
+        # Precomputed HTTP cache validator - serving a 304 later only
+        # needs this field, not a rehash of the whole markdown body
+        doc["etag"] = hashlib.md5(markdown.encode()).hexdigest()
+        await notes_collection.update_one(
             {"video_id": video_id},
-            {
-                "$set": {
-                    "video_id": video_id,
-                    "topic": topic,
-                    "video_title": video_title,
-                    "markdown": markdown,
-                    "metadata": metadata,
-                    "generated_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow()
-                }
-            },
+            {"$set": doc},
             upsert=True
         )
-        print(f"  - 💾 Notes cached globally for video: {video_id}")
+        logger.debug("Notes cached globally for video %s", video_id)
     except Exception as e:
-        print(f"  - ⚠️ Cache save error: {e}")
+        logger.warning("Cache save error: %s", e)
 
 
 # ============================================================================
@@ -98,57 +161,84 @@ async def get_notes_history(current_user: dict = Depends(get_current_user)):
     Get list of all AI-generated notes (global).
     Returns unique notes per video_id (no duplicates).
     """
-    print(f"\n[Notes API] 📚 GET /notes/history")
+    logger.debug("GET /notes/history")
     
-    if not is_db_connected():
+    if not await is_db_connected():
         return {"notes": [], "message": "Database not connected"}
     
     try:
-        # Get all cached notes, sorted by most recent
-        cursor = notes_collection.find({}).sort("generated_at", -1).limit(100)
-        
-        # Deduplicate by video_id (keep first/most recent occurrence)
-        seen_video_ids = set()
+        # Dedup by video_id and slice the preview server-side: the full
+        # markdown bodies (potentially 100s of KB each) never leave Mongo,
+        # only the 150-byte previews do.
+        pipeline = [
+            {"$sort": {"generated_at": -1}},
+            {"$group": {"_id": "$video_id", "doc": {"$first": "$$ROOT"}}},
+            {"$replaceRoot": {"newRoot": "$doc"}},
+            {"$sort": {"generated_at": -1}},
+            {"$project": {
+                "_id": 0,
+                "video_id": 1,
+                "video_title": 1,
+                "topic": 1,
+                "generated_at": 1,
+                # $substrCP counts code points - $substrBytes errors out if
+                # offset 150 splits a multi-byte UTF-8 char, which is routine
+                # in Gemini markdown (dashes, bullets, emoji)
+                "preview": {"$substrCP": [{"$ifNull": ["$markdown", ""]}, 0, 150]}
+            }},
+            {"$limit": 100}
+        ]
+
         notes_list = []
-        
-        for doc in cursor:
-            vid = doc.get("video_id", "")
-            if vid and vid not in seen_video_ids:
-                seen_video_ids.add(vid)
-                notes_list.append({
-                    "video_id": vid,
-                    "video_title": doc.get("video_title", "Untitled"),
-                    "topic": doc.get("topic", ""),
-                    "generated_at": str(doc.get("generated_at", "")),
-                    "preview": doc.get("markdown", "")[:150] + "..." if doc.get("markdown") else ""
-                })
-        
-        print(f"  - Found {len(notes_list)} unique notes")
+        async for doc in notes_collection.aggregate(pipeline):
+            if not doc.get("video_id"):
+                continue
+            notes_list.append({
+                "video_id": doc["video_id"],
+                "video_title": doc.get("video_title", "Untitled"),
+                "topic": doc.get("topic", ""),
+                "generated_at": str(doc.get("generated_at", "")),
+                "preview": doc["preview"] + "..." if doc.get("preview") else ""
+            })
+
+        logger.debug("Found %d unique notes", len(notes_list))
         return {"notes": notes_list}
-        
+
     except Exception as e:
-        print(f"  - ❌ Error: {e}")
+        logger.warning("History query failed: %s", e)
         return {"notes": [], "error": str(e)}
 
 
 @router.get("/{video_id}")
-async def get_note_by_video(video_id: str):
+async def get_note_by_video(video_id: str, request: Request):
     """
     Get specific AI-generated note by video ID.
     No auth required - notes are public/global.
+    Notes are immutable post-generation, so responses carry an ETag and
+    a matching If-None-Match gets a bodyless 304.
     """
-    print(f"\n[Notes API] 📖 GET /notes/{video_id}")
-    
-    cached = get_cached_notes(video_id)
+    logger.debug("GET /notes/%s", video_id)
+
+    cached = await get_cached_notes(video_id)
     if cached:
-        return {
-            "markdown": cached.get("markdown", ""),
-            "video_title": cached.get("video_title", ""),
-            "topic": cached.get("topic", ""),
-            "generated_at": str(cached.get("generated_at", "")),
-            "found": True
-        }
-    
+        markdown = cached.get("markdown", "")
+        etag = cached.get("etag") or hashlib.md5(markdown.encode()).hexdigest()
+        cache_headers = {"ETag": etag, "Cache-Control": "public, max-age=86400"}
+
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=cache_headers)
+
+        return JSONResponse(
+            content={
+                "markdown": markdown,
+                "video_title": cached.get("video_title", ""),
+                "topic": cached.get("topic", ""),
+                "generated_at": str(cached.get("generated_at", "")),
+                "found": True
+            },
+            headers=cache_headers
+        )
+
     return {"found": False, "message": "Note not found"}
 
 
@@ -161,16 +251,14 @@ async def generate_notes(request: NoteRequest, current_user: dict = Depends(get_
     2. If not cached (or force_regenerate), generate new notes
     3. Save to global cache before returning
     """
-    print(f"\n[Notes API] 📝 POST /notes/generate")
-    print(f"  - Topic: {request.topic}")
-    print(f"  - Video ID: {request.video_id or 'None'}")
-    print(f"  - Force Regenerate: {request.force_regenerate}")
+    logger.debug("POST /notes/generate topic=%s video=%s force=%s",
+                 request.topic, request.video_id, request.force_regenerate)
     
     # If no video_id, we can't cache - use topic-only fallback
     if not request.video_id:
-        print(f"  - ⚠️ No video_id provided, using topic-only mode")
+        logger.debug("No video_id provided, using topic-only mode")
         from .ai_coach import generate_study_notes
-        notes = generate_study_notes(
+        notes = await generate_study_notes(
             topic=request.topic,
             video_title=request.video_title,
             transcript=None
@@ -186,7 +274,7 @@ async def generate_notes(request: NoteRequest, current_user: dict = Depends(get_
     # STEP 1: Check Global Cache (unless force_regenerate)
     # ========================================
     if not request.force_regenerate:
-        cached = get_cached_notes(request.video_id)
+        cached = await get_cached_notes(request.video_id)
         if cached:
             return {
                 "markdown": cached.get("markdown", ""),
@@ -205,9 +293,9 @@ async def generate_notes(request: NoteRequest, current_user: dict = Depends(get_
     transcript = get_video_transcript(request.video_id)
     
     if not transcript:
-        print(f"  - ⚠️ No transcript found for video: {request.video_id}")
+        logger.debug("No transcript found for video %s", request.video_id)
         from .ai_coach import generate_study_notes
-        notes = generate_study_notes(
+        notes = await generate_study_notes(
             topic=request.topic,
             video_title=request.video_title,
             transcript=None
@@ -219,13 +307,41 @@ async def generate_notes(request: NoteRequest, current_user: dict = Depends(get_
             "metadata": {"mode": "topic_only", "reason": "no_transcript_found"}
         }
     
-    print(f"  - ✅ Full Transcript: {len(transcript)} chars")
-    
+    logger.debug("Full transcript: %d chars", len(transcript))
+
+    # ========================================
+    # STEP 2b: Content-level dedup - identical transcripts (mirrors,
+    # re-uploads) reuse the already-generated notes instead of paying
+    # the full Gemini run again
+    # ========================================
+    transcript_hash = _transcript_hash(transcript)
+    if not request.force_regenerate:
+        duplicate = await get_notes_by_transcript_hash(transcript_hash)
+        if duplicate:
+            logger.debug("Transcript hash hit (from video %s)", duplicate.get("video_id"))
+            await save_notes_to_cache(
+                video_id=request.video_id,
+                topic=request.topic,
+                video_title=request.video_title,
+                markdown=duplicate.get("markdown", ""),
+                metadata=duplicate.get("metadata", {}),
+                transcript_hash=transcript_hash
+            )
+            return {
+                "markdown": duplicate.get("markdown", ""),
+                "rag_enabled": True,
+                "cached": True,
+                "metadata": {
+                    **duplicate.get("metadata", {}),
+                    "source": "transcript_hash_match"
+                }
+            }
+
     # ========================================
     # STEP 3: Generate Notes (Chunking & Stitching)
     # ========================================
     try:
-        notes, metadata = generate_comprehensive_notes(
+        notes, metadata = await generate_comprehensive_notes(
             topic=request.topic,
             video_title=request.video_title,
             transcript=transcript
@@ -234,12 +350,13 @@ async def generate_notes(request: NoteRequest, current_user: dict = Depends(get_
         # ========================================
         # STEP 4: Save to Global Cache
         # ========================================
-        save_notes_to_cache(
+        await save_notes_to_cache(
             video_id=request.video_id,
             topic=request.topic,
             video_title=request.video_title,
             markdown=notes,
-            metadata=metadata
+            metadata=metadata,
+            transcript_hash=transcript_hash
         )
         
         return {
@@ -250,5 +367,66 @@ async def generate_notes(request: NoteRequest, current_user: dict = Depends(get_
         }
         
     except Exception as e:
-        print(f"  - ❌ Error: {str(e)}")
+        logger.warning("Notes generation failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/generate/stream")
+async def generate_notes_stream(request: NoteRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Streaming variant of /generate.
+
+    Sends markdown chunks as Gemini produces them so the frontend can render
+    the first notes within a few hundred ms instead of waiting for the full
+    decode. Cached notes are returned as a single chunk; fresh generations
+    are saved to the global cache once the stream completes, but only when
+    the whole transcript fit the single-pass prompt.
+    """
+    from .ai_coach import generate_study_notes_stream
+
+    logger.debug("POST /notes/generate/stream topic=%s video=%s", request.topic, request.video_id)
+
+    # Cached notes: stream back in one chunk (no LLM call needed)
+    if request.video_id and not request.force_regenerate:
+        cached = await get_cached_notes(request.video_id)
+        if cached:
+            return StreamingResponse(
+                iter([cached.get("markdown", "")]),
+                media_type="text/markdown"
+            )
+
+    # Blocking Chroma read - keep it off the event loop
+    transcript = (
+        await asyncio.to_thread(get_video_transcript, request.video_id)
+        if request.video_id else None
+    )
+
+    # The streaming path is a single Gemini pass that truncates the
+    # transcript at this budget (see ai_coach._build_notes_prompt). Only
+    # cache its output when nothing was cut off - otherwise the truncated
+    # notes would poison the global cache that /generate fills with the
+    # full chunked-service output.
+    cacheable = transcript is not None and len(transcript) <= 40000
+
+    async def stream_and_cache():
+        parts = []
+        async for text in generate_study_notes_stream(
+            topic=request.topic,
+            video_title=request.video_title,
+            transcript=transcript
+        ):
+            parts.append(text)
+            yield text
+
+        # Persist the stitched output so later requests hit the cache
+        if request.video_id and cacheable:
+            await save_notes_to_cache(
+                video_id=request.video_id,
+                topic=request.topic,
+                video_title=request.video_title,
+                markdown="".join(parts),
+                metadata={"mode": "streamed"},
+                transcript_hash=_transcript_hash(transcript)
+            )
+
+    return StreamingResponse(stream_and_cache(), media_type="text/markdown")
@@ -1,17 +1,25 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
-from typing import Optional
+import hashlib
+import json
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 from .auth import get_current_user 
 from .database import (
-    is_db_connected, 
-    get_or_create_user_progress, 
+    is_db_connected,
+    get_or_create_user_progress,
+    get_dashboard_summary,
     update_video_progress,
-    add_quiz_result
+    add_quiz_result,
+    bulk_update_progress,
+    bulk_update_video_progress
 )
 
-print("[Progress Module] ✅ Progress router loaded and ready")
+logger = logging.getLogger(__name__)
 
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
 
 # --- Pydantic Models ---
 class VideoProgressUpdate(BaseModel):
@@ -21,12 +29,22 @@ class VideoProgressUpdate(BaseModel):
     category: Optional[str] = "General"
     instructor: Optional[str] = "Unknown"
 
+    # Request bodies are never mutated after validation
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
 class QuizResult(BaseModel):
     topic: str
     score: int
     total_questions: int
     percentage: float
 
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+# YouTube thumbnail URL pieces - concatenated per video instead of
+# re-parsing an f-string template with the constant parts each time
+_YT_THUMB_PREFIX = "https://i.ytimg.com/vi/"
+_YT_THUMB_SUFFIX = "/hqdefault.jpg"
+
 # --- In-memory Fallback Database ---
 # Used when MongoDB is not connected (e.g., during initial setup or dev without DB)
 user_progress_fallback_db = {}
@@ -49,6 +67,16 @@ def get_or_create_user_fallback_progress(user_id: str):
         }
     return user_progress_fallback_db[user_id]
 
+def _video_progress_data(progress: VideoProgressUpdate) -> dict:
+    """Builds the stored per-video progress subdocument."""
+    return {
+        "watch_percentage": progress.watch_percentage,
+        "title": progress.title,
+        "category": progress.category,
+        "instructor": progress.instructor,
+        "last_watched": "now"
+    }
+
 # --- API Endpoints ---
 @router.post("/video")
 async def save_video_progress_endpoint(progress: VideoProgressUpdate, current_user: dict = Depends(get_current_user)):
@@ -57,23 +85,37 @@ async def save_video_progress_endpoint(progress: VideoProgressUpdate, current_us
     Tracks watch percentage and last watched timestamp.
     """
     user_id = current_user["id"]
-    
-    progress_data = {
-        "watch_percentage": progress.watch_percentage, 
-        "title": progress.title,
-        "category": progress.category, 
-        "instructor": progress.instructor,
-        "last_watched": "now"
-    }
-    
-    if is_db_connected():
+
+    progress_data = _video_progress_data(progress)
+
+    if await is_db_connected():
         await update_video_progress(user_id, progress.video_id, progress_data)
     else:
         user_data = get_or_create_user_fallback_progress(user_id)
         user_data["videos"][progress.video_id] = progress_data
-        
+
     return {"status": "success", "message": "Progress updated."}
 
+@router.post("/video/batch")
+async def save_video_progress_batch(updates: List[VideoProgressUpdate], current_user: dict = Depends(get_current_user)):
+    """
+    Saves progress for several videos in one call.
+    The whole batch is applied with a single bulk_write round-trip
+    instead of one update per video.
+    """
+    user_id = current_user["id"]
+
+    if await is_db_connected():
+        await bulk_update_video_progress(
+            user_id, {u.video_id: _video_progress_data(u) for u in updates}
+        )
+    else:
+        user_data = get_or_create_user_fallback_progress(user_id)
+        for u in updates:
+            user_data["videos"][u.video_id] = _video_progress_data(u)
+
+    return {"status": "success", "message": f"{len(updates)} progress updates saved."}
+
 @router.post("/quiz")
 async def save_quiz_result(result: QuizResult, current_user: dict = Depends(get_current_user)):
     """
@@ -81,68 +123,128 @@ async def save_quiz_result(result: QuizResult, current_user: dict = Depends(get_
     """
     user_id = current_user["id"]
     
-    if is_db_connected():
-        await add_quiz_result(user_id, result.dict())
+    if await is_db_connected():
+        await add_quiz_result(user_id, result.model_dump())
     else:
         user_data = get_or_create_user_fallback_progress(user_id)
-        user_data["quizzes"].append(result.dict())
-        
+        user_data["quizzes"].append(result.model_dump())
+
     return {"status": "success", "message": "Quiz result saved."}
 
+@router.post("/quiz/batch")
+async def save_quiz_results_batch(results: List[QuizResult], current_user: dict = Depends(get_current_user)):
+    """
+    Saves several quiz results in one call via a single bulk_write.
+    """
+    user_id = current_user["id"]
+
+    if await is_db_connected():
+        from .database import QUIZ_HISTORY_LIMIT
+        ops = [
+            {
+                "$push": {"quizzes": {"$each": [r.model_dump()], "$slice": -QUIZ_HISTORY_LIMIT}},
+                "$inc": {"total_quizzes_taken": 1}
+            }
+            for r in results
+        ]
+        await bulk_update_progress(user_id, ops)
+    else:
+        user_data = get_or_create_user_fallback_progress(user_id)
+        for r in results:
+            user_data["quizzes"].append(r.model_dump())
+
+    return {"status": "success", "message": f"{len(results)} quiz results saved."}
+
 @router.get("/dashboard")
-async def get_dashboard_data(current_user: dict = Depends(get_current_user)):
+async def get_dashboard_data(request: Request, current_user: dict = Depends(get_current_user)):
     """
     Aggregates data for the user's dashboard.
     Calculates average scores, streaks, and learning progress.
+    Responses carry a content ETag; an unchanged dashboard answers a
+    matching If-None-Match with a bodyless 304.
     """
     user_id = current_user["id"]
     user_name = current_user.get("full_name", current_user.get("email", "Learner"))
     
-    print(f"\n[Progress] 📊 DASHBOARD REQUEST")
-    print(f"  - User: {user_name} ({user_id[:8]}...)")
+    logger.debug("Dashboard request for %s (%s...)", user_name, user_id[:8])
 
-    if is_db_connected():
-        user_data = await get_or_create_user_progress(user_id)
+    if await is_db_connected():
+        # Single server-side aggregation - the quiz array is reduced to
+        # four scalars on the server instead of shipping it all here
+        summary = await get_dashboard_summary(user_id)
+        if summary is None:
+            # First visit: create the empty progress doc, nothing to aggregate
+            await get_or_create_user_progress(user_id)
+            summary = {}
     else:
+        # In-memory fallback: compute the same summary shape in Python.
+        # One pass over the quizzes gives count/sum/min/max together
+        # instead of separate sum()/max()/min() scans.
         user_data = get_or_create_user_fallback_progress(user_id)
-    
-    # Calculate quiz statistics
-    quiz_scores = [q["percentage"] for q in user_data["quizzes"]]
-    avg_score = sum(quiz_scores) / len(quiz_scores) if quiz_scores else 0
-    highest_score = max(quiz_scores) if quiz_scores else 0
-    lowest_score = min(quiz_scores) if quiz_scores else 0
-    
-    print(f"  - Quizzes Taken: {len(quiz_scores)}, Avg Score: {avg_score:.1f}%")
-    
+        quiz_count = 0
+        quiz_sum = 0.0
+        quiz_max = quiz_min = None
+        for q in user_data["quizzes"]:
+            pct = q["percentage"]
+            quiz_count += 1
+            quiz_sum += pct
+            if quiz_max is None or pct > quiz_max:
+                quiz_max = pct
+            if quiz_min is None or pct < quiz_min:
+                quiz_min = pct
+        video_progresses = [v.get("watch_percentage", 0) for v in user_data["videos"].values()]
+        summary = {
+            "streak": user_data.get("streak", 0),
+            "longest_streak": user_data.get("longest_streak", 0),
+            "quiz_count": quiz_count,
+            "quiz_avg": quiz_sum / quiz_count if quiz_count else None,
+            "quiz_max": quiz_max,
+            "quiz_min": quiz_min,
+            "videos": [dict(v, video_id=k) for k, v in user_data["videos"].items()],
+            "learning_progress": (
+                sum(video_progresses) / len(video_progresses) if video_progresses else None
+            ),
+        }
+
+    avg_score = summary.get("quiz_avg") or 0
+    logger.debug("Quizzes taken: %s, avg score: %.1f%%",
+                 summary.get("quiz_count", 0), avg_score)
+
     # Format ongoing videos list
     ongoing_videos = [
         {
-            "video_id": k,  # CRITICAL: Include video_id for navigation
-            "title": v.get("title", f"Video {k}"), 
-            "category": v.get("category", "General"), 
+            "video_id": v["video_id"],  # CRITICAL: Include video_id for navigation
+            "title": v.get("title", f"Video {v['video_id']}"),
+            "category": v.get("category", "General"),
             "instructor": v.get("instructor", "Unknown"),
-            "progress": v.get("watch_percentage", 0), 
-            "thumbnail": f"https://i.ytimg.com/vi/{k}/hqdefault.jpg"
+            "progress": v.get("watch_percentage", 0),
+            "thumbnail": _YT_THUMB_PREFIX + v["video_id"] + _YT_THUMB_SUFFIX
         }
-        for k, v in user_data["videos"].items()
+        for v in summary.get("videos") or []
     ]
-    
-    # Calculate overall learning progress based on video completion
-    video_progresses = [v.get("watch_percentage", 0) for v in user_data["videos"].values()]
-    learning_progress = sum(video_progresses) / len(video_progresses) if video_progresses else 0
 
-    return {
+    payload = {
         "user_name": user_name,
         "avg_quiz_score": {
-            "avg": round(avg_score, 2), 
-            "highest": round(highest_score, 2), 
-            "lowest": round(lowest_score, 2), 
-            "change": -10 
+            "avg": round(avg_score, 2),
+            "highest": round(summary.get("quiz_max") or 0, 2),
+            "lowest": round(summary.get("quiz_min") or 0, 2),
+            "change": -10
         },
         "weekly_streak": {
-            "current": user_data.get("streak", 0), 
-            "longest": user_data.get("longest_streak", 0)
+            "current": summary.get("streak", 0),
+            "longest": summary.get("longest_streak", 0)
         },
-        "learning_progress": round(learning_progress, 2),
+        "learning_progress": round(summary.get("learning_progress") or 0, 2),
         "ongoing_videos": ongoing_videos
     }
+
+    # Content ETag: unchanged dashboards skip re-serializing/re-sending
+    # the body (the summary itself comes from the write-invalidated cache)
+    etag = 'W/"%s"' % hashlib.md5(
+        json.dumps(payload, sort_keys=True, default=str).encode()
+    ).hexdigest()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return ORJSONResponse(content=payload, headers={"ETag": etag})
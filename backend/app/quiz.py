@@ -10,8 +10,11 @@ Provides endpoints for:
 All operations are fully logged for debugging.
 """
 
+import asyncio
+import logging
 from datetime import datetime
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends
+from fastapi.responses import ORJSONResponse
 from typing import List, Optional
 
 from .models import QuizSubmission, QuestionAnswer, DiagnosisPillar
@@ -26,30 +29,45 @@ from .database import (
 )
 from .auth import get_current_user
 from .search_engine import find_best_video
-from .ai_coach import generate_coaching_feedback, generate_smart_search_query
+from .ai_coach import generate_coaching_feedback, generate_feedback_and_query
 
-print("[Quiz Module] ✅ Quiz router loaded and ready (Two-Collection System)")
+logger = logging.getLogger(__name__)
 
-router = APIRouter()
+logger.info("Quiz router loaded (Two-Collection System)")
+
+# orjson serializes the (question-heavy) payloads much faster than the
+# stdlib json encoder behind the default JSONResponse
+router = APIRouter(default_response_class=ORJSONResponse)
 
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+# Enum values resolved once - iterating the enum and reading .value per
+# submission is pure overhead for a fixed set
+_PILLAR_VALUES = tuple(p.value for p in DiagnosisPillar)
+
+# Frontend field whitelist with fallbacks - correct_option_id is never
+# included, which is what prevents cheating
+_QUESTION_DEFAULTS = (
+    ("question_text", ""),
+    ("options", []),  # List of {id, text} objects
+    ("ideal_time_seconds", 30),
+    ("diagnosis_pillar", "Concept"),
+    ("difficulty", "Medium"),
+)
+
+
 def format_question_for_frontend(question: dict) -> dict:
     """
     Formats a database question for frontend consumption.
     Removes correct_option_id to prevent cheating.
     """
-    return {
-        "id": str(question.get("_id", "")),
-        "question_text": question.get("question_text", ""),
-        "options": question.get("options", []),  # List of {id, text} objects
-        "ideal_time_seconds": question.get("ideal_time_seconds", 30),
-        "diagnosis_pillar": question.get("diagnosis_pillar", "Concept"),
-        "difficulty": question.get("difficulty", "Medium"),
-    }
+    formatted = {"id": str(question.get("_id", ""))}
+    for key, default in _QUESTION_DEFAULTS:
+        formatted[key] = question.get(key, default)
+    return formatted
 
 
 # ============================================================================
@@ -62,23 +80,20 @@ async def get_quiz_topics(current_user: dict = Depends(get_current_user)):
     Returns the hierarchical topic structure for building the quiz selection menu.
     Structure: { subjects: [{_id, name, icon, topics: [{_id, name, question_count}]}] }
     """
-    print(f"\n{'='*60}")
-    print(f"[Quiz API] 📂 GET /quiz/topics")
-    print(f"  - User: {current_user.get('email')}")
+    logger.debug("GET /quiz/topics user=%s", current_user.get("email"))
     
-    if not is_db_connected():
-        print(f"  - ❌ Database not connected!")
+    if not await is_db_connected():
+        logger.error("Database not connected")
         raise HTTPException(status_code=503, detail="Database not connected")
     
     hierarchy = await get_topics_hierarchy()
     
     if not hierarchy:
-        print(f"  - ⚠️ No topics found in database")
+        logger.warning("No topics found in database")
         raise HTTPException(status_code=404, detail="No quiz topics found. Run migration script first.")
     
     total_topics = sum(len(s.get("topics", [])) for s in hierarchy)
-    print(f"  - ✅ Returning {len(hierarchy)} subjects, {total_topics} topics")
-    print(f"{'='*60}\n")
+    logger.debug("Returning %d subjects, %d topics", len(hierarchy), total_topics)
     
     return {"subjects": hierarchy}
 
@@ -89,33 +104,30 @@ async def start_quiz(topic_id: str, count: int = 10, current_user: dict = Depend
     Starts a quiz by returning random questions for a specific topic.
     Uses MongoDB $sample for true randomization.
     """
-    print(f"\n{'='*60}")
-    print(f"[Quiz API] 🎮 GET /quiz/start/{topic_id}")
-    print(f"  - Requested Questions: {count}")
+    logger.debug("GET /quiz/start/%s count=%d", topic_id, count)
     
-    if not is_db_connected():
-        print(f"  - ❌ Database not connected!")
+    if not await is_db_connected():
+        logger.error("Database not connected")
         raise HTTPException(status_code=503, detail="Database not connected")
     
     # Verify topic exists
     topic = await get_topic_by_id(topic_id)
     if not topic:
-        print(f"  - ❌ Topic not found: {topic_id}")
+        logger.warning("Topic not found: %s", topic_id)
         raise HTTPException(status_code=404, detail=f"Topic '{topic_id}' not found")
     
-    print(f"  - Topic Name: {topic.get('name')}")
+    logger.debug("Topic name: %s", topic.get("name"))
     
     # Get random questions
     questions = await get_random_questions_by_topic_id(topic_id, count=count)
     
     if not questions:
-        print(f"  - ❌ No questions found for topic")
+        logger.warning("No questions found for topic %s", topic_id)
         raise HTTPException(status_code=404, detail=f"No questions found for topic: {topic_id}")
     
     formatted_questions = [format_question_for_frontend(q) for q in questions]
     
-    print(f"  - ✅ Returning {len(formatted_questions)} questions")
-    print(f"{'='*60}\n")
+    logger.debug("Returning %d questions", len(formatted_questions))
     
     return {
         "topic_id": topic_id,
@@ -126,7 +138,7 @@ async def start_quiz(topic_id: str, count: int = 10, current_user: dict = Depend
 
 
 @router.post("/submit")
-async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(get_current_user)):
+async def submit_quiz(submission: QuizSubmission, background_tasks: BackgroundTasks, current_user: dict = Depends(get_current_user)):
     """
     Evaluates a quiz submission using the Diagnosis Matrix:
     1. Scores answers
@@ -134,53 +146,63 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
     3. Identifies weakest diagnosis_pillar
     4. Generates AI-powered recommendations
     """
-    print(f"\n{'='*60}")
-    print(f"[Quiz API] 📝 POST /quiz/submit")
-    print(f"  - User: {current_user.get('email', 'Unknown')}")
-    print(f"  - Topic ID: {submission.topic_id}")
-    print(f"  - Answers Received: {len(submission.answers)}")
-    print(f"  - Total Time: {submission.total_time_seconds}s")
-    
-    if not is_db_connected():
+    logger.debug("POST /quiz/submit user=%s topic=%s answers=%d time=%ss",
+                 current_user.get("email", "Unknown"), submission.topic_id,
+                 len(submission.answers), submission.total_time_seconds)
+    
+    if not await is_db_connected():
         raise HTTPException(status_code=503, detail="Database not connected")
     
     # Fetch the actual questions to get correct answers
     # Convert string IDs to ObjectId (MongoDB stores _id as ObjectId)
     from bson import ObjectId
-    
+
     question_ids = [a.question_id for a in submission.answers]
-    
-    # Try to convert to ObjectId (for ObjectId-based _ids)
-    object_ids = []
-    for qid in question_ids:
-        try:
-            object_ids.append(ObjectId(qid))
-        except:
-            pass  # Skip invalid ObjectId strings
-    
-    # Query with both formats for compatibility
-    questions_raw = list(questions_collection.find({
-        "$or": [
-            {"_id": {"$in": object_ids}},  # ObjectId format
-            {"_id": {"$in": question_ids}}  # String format (just in case)
-        ]
-    }))
+
+    # Validate to ObjectId without try/except per id
+    object_ids = [ObjectId(qid) for qid in question_ids if ObjectId.is_valid(qid)]
+
+    # Only the grading fields are needed here; skip question_text/options
+    _GRADING_PROJECTION = {
+        "correct_option_id": 1,
+        "diagnosis_pillar": 1,
+        "ideal_time_seconds": 1,
+        "search_tags": 1,
+    }
+
+    async def _load_grading_questions() -> list:
+        # ObjectId is the stored format; the $in hits the _id index directly
+        found = await questions_collection.find(
+            {"_id": {"$in": object_ids}}, _GRADING_PROJECTION
+        ).to_list(None)
+        if not found and question_ids:
+            # Legacy fallback: some seeds stored string _ids
+            found = await questions_collection.find(
+                {"_id": {"$in": question_ids}}, _GRADING_PROJECTION
+            ).to_list(None)
+        return found
+
+    # The topic lookup (needed in Phase 4) is independent of the question
+    # fetch, so run both round-trips concurrently
+    questions_raw, topic = await asyncio.gather(
+        _load_grading_questions(), get_topic_by_id(submission.topic_id)
+    )
     questions_map = {str(q["_id"]): q for q in questions_raw}
     
-    print(f"  - Questions Loaded: {len(questions_map)}")
+    logger.debug("Questions loaded: %d", len(questions_map))
     
     # =========================================================================
     # PHASE 1: SCORING & PILLAR TRACKING
     # =========================================================================
-    print(f"\n[Diagnosis] 🧠 PHASE 1: SCORING")
-    
     score = 0
     total_questions = len(submission.answers)
     
-    # Track pillar statistics
-    pillar_stats = {}
-    for pillar in DiagnosisPillar:
-        pillar_stats[pillar.value] = {"correct": 0, "total": 0, "rushed": 0, "time_ratio": []}
+    # Track pillar statistics - running sums, no per-pillar lists to
+    # re-walk later
+    pillar_stats = {
+        pillar: {"correct": 0, "total": 0, "rushed": 0, "time_ratio_sum": 0.0}
+        for pillar in _PILLAR_VALUES
+    }
     
     failed_questions = []
     attempt_records = []
@@ -190,7 +212,7 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
     for answer in submission.answers:
         question = questions_map.get(answer.question_id)
         if not question:
-            print(f"  - ⚠️ Question {answer.question_id} not found, skipping")
+            logger.warning("Question %s not found, skipping", answer.question_id)
             continue
         
         correct_option = question.get("correct_option_id")
@@ -200,23 +222,25 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
         ideal_time = question.get("ideal_time_seconds", 30)
         time_ratio = answer.time_taken_seconds / ideal_time if ideal_time > 0 else 1
         
-        # Dynamic init for unknown pillars (e.g. "Security")
-        if pillar not in pillar_stats:
-            pillar_stats[pillar] = {"correct": 0, "total": 0, "rushed": 0, "time_ratio": []}
-            
+        # Dynamic init for unknown pillars (e.g. "Security"); bind the
+        # stats dict once instead of re-hashing the pillar key per field
+        stats = pillar_stats.get(pillar)
+        if stats is None:
+            stats = pillar_stats[pillar] = {"correct": 0, "total": 0, "rushed": 0, "time_ratio_sum": 0.0}
+
         # Update pillar stats
-        pillar_stats[pillar]["total"] += 1
-        pillar_stats[pillar]["time_ratio"].append(time_ratio)
-        
+        stats["total"] += 1
+        stats["time_ratio_sum"] += time_ratio
+
         if is_correct:
             score += 1
-            pillar_stats[pillar]["correct"] += 1
+            stats["correct"] += 1
         else:
             failed_questions.append(question)
-        
+
         # Check if rushed (less than 30% of ideal time)
         if time_ratio < 0.3:
-            pillar_stats[pillar]["rushed"] += 1
+            stats["rushed"] += 1
         
         # Record for persistent storage
         attempt_records.append({
@@ -231,18 +255,16 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
         })
     
     percentage = (score / total_questions) * 100 if total_questions > 0 else 0
-    print(f"  - Score: {score}/{total_questions} ({percentage:.1f}%)")
+    logger.debug("Score: %d/%d (%.1f%%)", score, total_questions, percentage)
     
     # =========================================================================
     # PHASE 2: FIND WEAKEST PILLAR
     # =========================================================================
-    print(f"\n[Diagnosis] 📊 PHASE 2: PILLAR ANALYSIS")
-    
     pillar_breakdown = {}
     for pillar, stats in pillar_stats.items():
         if stats["total"] > 0:
             accuracy = (stats["correct"] / stats["total"]) * 100
-            avg_time_ratio = sum(stats["time_ratio"]) / len(stats["time_ratio"])
+            avg_time_ratio = stats["time_ratio_sum"] / stats["total"]
             pillar_breakdown[pillar] = {
                 "correct": stats["correct"],
                 "total": stats["total"],
@@ -250,7 +272,8 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
                 "rushed_count": stats["rushed"],
                 "avg_time_ratio": round(avg_time_ratio, 2)
             }
-            print(f"  - {pillar}: {stats['correct']}/{stats['total']} ({accuracy:.1f}%), Rushed: {stats['rushed']}")
+            logger.debug("%s: %d/%d (%.1f%%), rushed: %d",
+                         pillar, stats["correct"], stats["total"], accuracy, stats["rushed"])
     
     # Determine weakest pillar (lowest accuracy, higher total questions = more weight)
     weakest_pillar = "Concept"  # Default
@@ -260,17 +283,15 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
             lowest_accuracy = data["accuracy"]
             weakest_pillar = pillar
     
-    print(f"  - ⚠️ Weakest Pillar: {weakest_pillar} ({lowest_accuracy:.1f}%)")
+    logger.debug("Weakest pillar: %s (%.1f%%)", weakest_pillar, lowest_accuracy)
     
     # =========================================================================
     # PHASE 3: DETERMINE LEARNER PROFILE
     # =========================================================================
-    print(f"\n[Diagnosis] 👤 PHASE 3: PROFILE CLASSIFICATION")
-    
+    active_pillars = [s for s in pillar_stats.values() if s["total"]]
     avg_time_ratio = sum(
-        sum(s["time_ratio"]) / len(s["time_ratio"]) 
-        for s in pillar_stats.values() if s["time_ratio"]
-    ) / max(1, len([s for s in pillar_stats.values() if s["time_ratio"]]))
+        s["time_ratio_sum"] / s["total"] for s in active_pillars
+    ) / max(1, len(active_pillars))
     
     total_rushed = sum(s["rushed"] for s in pillar_stats.values())
     rushed_percentage = (total_rushed / total_questions) * 100 if total_questions > 0 else 0
@@ -282,29 +303,32 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
     else:
         learner_profile = "Struggling"
     
-    print(f"  - Avg Time Ratio: {avg_time_ratio:.2f}")
-    print(f"  - Rushed Percentage: {rushed_percentage:.1f}%")
-    print(f"  - Profile: {learner_profile}")
+    logger.debug("Profile: %s (avg_time_ratio=%.2f, rushed=%.1f%%)",
+                 learner_profile, avg_time_ratio, rushed_percentage)
     
     # =========================================================================
     # PHASE 4: AI-POWERED RECOMMENDATIONS
     # =========================================================================
-    print(f"\n[Diagnosis] 🤖 PHASE 4: AI RECOMMENDATIONS")
-    
-    # Get topic name for context
-    topic = await get_topic_by_id(submission.topic_id)
+    # Topic was fetched up front alongside the questions
     topic_name = topic.get("name", submission.topic_id) if topic else submission.topic_id
     
-    # Collect UNIQUE search tags from failed questions
-    failed_tags = []
+    # Collect UNIQUE search tags from failed questions. dict.fromkeys
+    # keeps first-seen order (set() reshuffles per run, which made the
+    # search query non-deterministic), and we stop once 5 are collected.
+    unique_failed_tags = []
+    seen_tags = set()
     for q in failed_questions:
-        failed_tags.extend(q.get("search_tags", []))
-    unique_failed_tags = list(set(failed_tags))[:5]  # Limit to top 5 unique tags
-    
-    print(f"  - Failed Question Tags: {unique_failed_tags}")
+        for tag in q.get("search_tags", []):
+            if tag not in seen_tags:
+                seen_tags.add(tag)
+                unique_failed_tags.append(tag)
+                if len(unique_failed_tags) == 5:
+                    break
+        else:
+            continue
+        break
     
-    # Generate AI feedback
-    feedback = generate_coaching_feedback(learner_profile, [weakest_pillar], topic_name, percentage)
+    logger.debug("Failed question tags: %s", unique_failed_tags)
     
     # Build SPECIFIC search query using failed tags
     # PRIORITY: Specific concepts first, then topic context
@@ -314,28 +338,41 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
         # Format: "specific_concept in topic_context explanation"
         primary_concept = unique_failed_tags[0]  # Most important failed concept
         other_concepts = " ".join(unique_failed_tags[1:3]) if len(unique_failed_tags) > 1 else ""
-        
+
         # Smart query: emphasize subtopic, not just main topic
         search_query = f"{primary_concept} {other_concepts} {topic_name} {weakest_pillar} tutorial explained step by step"
-        print(f"  - Smart Query (subtopic-focused): {search_query}")
+        logger.debug("Smart query (subtopic-focused): %s", search_query)
+
+        feedback = await generate_coaching_feedback(
+            learner_profile, [weakest_pillar], topic_name, percentage
+        )
     else:
-        # Fallback to AI-generated query if no tags
-        search_query = generate_smart_search_query(learner_profile, topic_name, [weakest_pillar])
+        # No tags: one merged Gemini call returns the coaching tip and
+        # the search query together instead of two round-trips.
+        feedback, search_query = await generate_feedback_and_query(
+            learner_profile, topic_name, [weakest_pillar], percentage
+        )
     
     # Find video recommendations
-    print(f"[Quiz] 🔍 Searching for videos...")
-    print(f"  - Query: {search_query}")
-    recommendations = find_best_video(search_query)
-    print(f"  - Found: {len(recommendations)} videos")
+    logger.debug("Searching videos for query: %s", search_query)
+    recommendations = await find_best_video(search_query)
+    logger.debug("Found %d videos", len(recommendations))
     
     # =========================================================================
     # PHASE 5: PERSIST DATA
     # =========================================================================
-    print(f"\n[Diagnosis] 💾 PHASE 5: SAVING DATA")
-    
+    # Persist after the response is sent - the client doesn't read
+    # anything back from these writes. ordered=False lets the bulk insert
+    # continue past an individual document failure.
     if attempt_records:
-        quiz_attempts_collection.insert_many(attempt_records)
-        print(f"  - Saved {len(attempt_records)} attempt records")
+        # Wrapped in a coroutine so BackgroundTasks awaits it on the event
+        # loop; passing the motor method directly would run it in a worker
+        # thread, where motor has no event loop and the insert fails.
+        async def _persist_attempts():
+            await quiz_attempts_collection.insert_many(attempt_records, ordered=False)
+
+        background_tasks.add_task(_persist_attempts)
+        logger.debug("Queued %d attempt records", len(attempt_records))
     
     primary_video_id = recommendations[0].get("video_id") if recommendations else None
     
@@ -353,12 +390,11 @@ async def submit_quiz(submission: QuizSubmission, current_user: dict = Depends(g
         "submitted_at": timestamp
     }
     
-    await add_quiz_result(user_id, quiz_result_record)
-    print(f"  - Saved quiz summary")
+    background_tasks.add_task(add_quiz_result, user_id, quiz_result_record)
+    logger.debug("Queued quiz summary")
     
-    print(f"\n{'='*60}")
-    print(f"[Quiz API] ✅ QUIZ SUBMISSION COMPLETE")
-    print(f"{'='*60}\n")
+    logger.info("Quiz submission complete: %d/%d, profile=%s",
+                score, total_questions, learner_profile)
     
     # =========================================================================
     # RESPONSE
@@ -393,9 +429,9 @@ async def get_quiz_by_topic_legacy(topic: str, limit: Optional[int] = 10):
     """
     from .database import get_questions_by_topic
     
-    print(f"\n[Quiz API] ⚠️ LEGACY ENDPOINT: /quiz/legacy/{topic}")
+    logger.warning("Legacy endpoint hit: /quiz/legacy/%s", topic)
     
-    if not is_db_connected():
+    if not await is_db_connected():
         raise HTTPException(status_code=503, detail="Database not connected")
     
     questions = await get_questions_by_topic(topic, limit=limit)
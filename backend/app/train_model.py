@@ -23,6 +23,7 @@ import pandas as pd
 from sklearn.cluster import KMeans
 from sklearn.preprocessing import StandardScaler
 import joblib
+import json
 import os
 
 # ============================================================================
@@ -32,6 +33,7 @@ import os
 NUM_STUDENTS = 5000  # Number of synthetic records to generate (IEEE-scale validation)
 NUM_CLUSTERS = 3    # Learner profile categories
 MODEL_PATH = "./student_clustering_model.pkl"
+PARAMS_PATH = "./model_params.json"
 RANDOM_SEED = 42    # For reproducibility
 
 # ============================================================================
@@ -207,15 +209,19 @@ def save_model(model, scaler, labels_mapping, filepath: str):
     - The scaler (to transform new data the same way)
     - The cluster labels mapping
     
-    We save everything as one dictionary in a .pkl file.
-    
+    We save everything as one dictionary in a .pkl file, plus a small
+    model_params.json holding just the numbers the online engine needs
+    (scaler mean/scale, cluster centers, labels). quiz_engine loads the
+    JSON file, which avoids pickle deserialization and any sklearn
+    version-compatibility issues at runtime.
+
     Args:
         model: Trained KMeans model
         scaler: Fitted StandardScaler
         labels_mapping: Dictionary mapping cluster IDs to labels
         filepath: Where to save the file
     """
-    
+
     model_package = {
         'model': model,
         'scaler': scaler,
@@ -223,12 +229,27 @@ def save_model(model, scaler, labels_mapping, filepath: str):
         'version': '1.0.0',
         'features': ['avg_score', 'avg_time_per_question']
     }
-    
+
     joblib.dump(model_package, filepath)
-    
+
     file_size = os.path.getsize(filepath) / 1024  # KB
     print(f"\nModel saved to: {filepath} ({file_size:.1f} KB)")
 
+    # Lightweight parameter file for the online engine
+    model_params = {
+        'mean': scaler.mean_.tolist(),
+        'scale': scaler.scale_.tolist(),
+        'centers': model.cluster_centers_.tolist(),
+        'labels': labels_mapping,
+        'version': '1.0.0',
+        'features': ['avg_score', 'avg_time_per_question']
+    }
+
+    with open(PARAMS_PATH, 'w') as f:
+        json.dump(model_params, f, indent=2)
+
+    print(f"Model parameters saved to: {PARAMS_PATH}")
+
 
 # ============================================================================
 # MAIN EXECUTION
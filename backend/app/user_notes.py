@@ -5,6 +5,8 @@ Handles saving/loading user's personal handwritten notes from the video canvas.
 Stored separately from AI-generated notes.
 """
 
+import logging
+
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional
@@ -12,7 +14,7 @@ from datetime import datetime
 from .database import database, is_db_connected
 from .auth import get_current_user
 
-print("[User Notes Module] ✅ User Notes router loaded")
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -41,13 +43,13 @@ async def save_user_notes(request: UserNoteRequest, current_user: dict = Depends
     """
     user_id = current_user["id"]
     
-    print(f"[User Notes] 💾 Saving notes for user: {user_id}, video: {request.video_id}")
+    logger.debug("Saving notes for user %s, video %s", user_id, request.video_id)
     
-    if not is_db_connected():
+    if not await is_db_connected():
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        user_notes_collection.update_one(
+        await user_notes_collection.update_one(
             {"user_id": user_id, "video_id": request.video_id},
             {
                 "$set": {
@@ -67,7 +69,7 @@ async def save_user_notes(request: UserNoteRequest, current_user: dict = Depends
         return {"status": "success", "message": "Notes saved"}
         
     except Exception as e:
-        print(f"[User Notes] ❌ Error saving: {e}")
+        logger.error("Error saving notes: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -78,13 +80,13 @@ async def get_user_notes(video_id: str, current_user: dict = Depends(get_current
     """
     user_id = current_user["id"]
     
-    print(f"[User Notes] 📖 Getting notes for user: {user_id}, video: {video_id}")
+    logger.debug("Getting notes for user %s, video %s", user_id, video_id)
     
-    if not is_db_connected():
+    if not await is_db_connected():
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        notes = user_notes_collection.find_one(
+        notes = await user_notes_collection.find_one(
             {"user_id": user_id, "video_id": video_id}
         )
         
@@ -99,7 +101,7 @@ async def get_user_notes(video_id: str, current_user: dict = Depends(get_current
         }
         
     except Exception as e:
-        print(f"[User Notes] ❌ Error getting: {e}")
+        logger.error("Error getting notes: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -110,14 +112,14 @@ async def get_all_user_notes(current_user: dict = Depends(get_current_user)):
     """
     user_id = current_user["id"]
     
-    if not is_db_connected():
+    if not await is_db_connected():
         raise HTTPException(status_code=503, detail="Database not connected")
     
     try:
-        notes = list(user_notes_collection.find(
+        notes = await user_notes_collection.find(
             {"user_id": user_id},
             {"_id": 0, "video_id": 1, "video_title": 1, "updated_at": 1}
-        ).sort("updated_at", -1).limit(10))
+        ).sort("updated_at", -1).limit(10).to_list(length=10)
         
         # Convert datetime to string
         for note in notes:
@@ -127,5 +129,5 @@ async def get_all_user_notes(current_user: dict = Depends(get_current_user)):
         return {"notes": notes}
         
     except Exception as e:
-        print(f"[User Notes] ❌ Error listing: {e}")
+        logger.error("Error listing notes: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,13 +1,18 @@
 # backend/app/video.py
+import asyncio
+import logging
 import os
 import google.generativeai as genai
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
 from .search_engine import get_video_transcript
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # --- API Configuration ---
@@ -20,7 +25,7 @@ try:
     youtube = build('youtube', 'v3', developerKey=YOUTUBE_API_KEY)
     gemini_model = genai.GenerativeModel('gemini-2.5-flash')
 except Exception as e:
-    print(f"Error initializing APIs: {e}")
+    logger.warning("Error initializing APIs: %s", e)
     # Set to None to handle gracefully in endpoints
     youtube = None
     gemini_model = None
@@ -42,7 +47,8 @@ async def search_videos(query: str):
             type="video",
             maxResults=9
         )
-        response = request.execute()
+        # Blocking HTTPS round-trip - keep it off the event loop
+        response = await asyncio.to_thread(request.execute)
         
         videos = []
         for item in response.get("items", []):
@@ -62,10 +68,10 @@ async def get_transcript(video_id: str):
     Retrieves the stored transcript for a video from ChromaDB.
     Used by the video player page to display transcript alongside the video.
     """
-    print(f"[Video API] 📜 GET /video/transcript/{video_id}")
+    logger.debug("GET /video/transcript/%s", video_id)
     
     try:
-        transcript = get_video_transcript(video_id)
+        transcript = await asyncio.to_thread(get_video_transcript, video_id)
         
         if not transcript:
             return {"transcript": "Transcript not available for this video.", "available": False}
@@ -73,7 +79,7 @@ async def get_transcript(video_id: str):
         return {"transcript": transcript, "available": True, "length": len(transcript)}
         
     except Exception as e:
-        print(f"[Video API] ❌ Error getting transcript: {e}")
+        logger.error("Error getting transcript: %s", e)
         return {"transcript": "Error loading transcript.", "available": False}
 
 
@@ -81,15 +87,36 @@ async def get_transcript(video_id: str):
 async def get_notes(video_id: str, title: str):
     """
     Generates study notes for a specific video using the Gemini AI model.
-    Uses the video title to prompt the AI for key concepts and learning points.
+    Streams the text back as it is generated, so the client starts
+    rendering at first-token latency instead of waiting for the full
+    response.
     """
     if not gemini_model:
         raise HTTPException(status_code=500, detail="Gemini API not configured.")
-    
+
     try:
-        prompt = f"Generate concise, helpful notes for a video titled '{title}'. Focus on the key concepts and learning points someone watching this video would need to know."
-        response = gemini_model.generate_content(prompt)
-        return {"notes": response.text}
-    except Exception as gemini_e:
-        raise HTTPException(status_code=500, detail=f"Gemini failed to generate notes: {gemini_e}")
+        # Ground the notes in the stored transcript when we have one - a
+        # local ChromaDB read - and only fall back to a title-only prompt
+        # for videos that were never processed.
+        transcript = await asyncio.to_thread(get_video_transcript, video_id)
+        if transcript:
+            prompt = (
+                f"Generate concise, helpful notes for a video titled '{title}' "
+                f"based on its transcript below. Focus on the key concepts and "
+                f"learning points someone watching this video would need to know.\n\n"
+                f"TRANSCRIPT:\n{transcript[:15000]}"
+            )
+        else:
+            prompt = f"Generate concise, helpful notes for a video titled '{title}'. Focus on the key concepts and learning points someone watching this video would need to know."
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Could not prepare notes prompt: {e}")
+
+    def generate_chunks():
+        # Sync generator: Starlette iterates it in a threadpool, so the
+        # blocking Gemini stream never touches the event loop
+        for chunk in gemini_model.generate_content(prompt, stream=True):
+            if chunk.text:
+                yield chunk.text
+
+    return StreamingResponse(generate_chunks(), media_type="text/plain")
 
@@ -28,13 +28,21 @@ def load_quizzes_to_db():
 
         print("Starting to load quizzes into the database...")
 
+        # Fetch every existing topic once instead of a find_one per quiz
+        existing_topics = set(collection.distinct("topic"))
+
+        new_quizzes = []
         for quiz in quizzes_data:
             # Check if a quiz with the same topic already exists
-            if collection.find_one({"topic": quiz["topic"]}):
+            if quiz["topic"] in existing_topics:
                 print(f"Quiz with topic '{quiz['topic']}' already exists. Skipping.")
             else:
-                # Insert the new quiz
-                collection.insert_one(quiz)
+                new_quizzes.append(quiz)
+
+        # One bulk write for everything new instead of an insert_one per quiz
+        if new_quizzes:
+            collection.insert_many(new_quizzes, ordered=False)
+            for quiz in new_quizzes:
                 print(f"Successfully inserted quiz with topic: '{quiz['topic']}'")
 
         print("Finished loading quizzes.")
@@ -1,8 +1,17 @@
 # backend/main.py
+import logging
+import os
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+
+# Module loggers default to INFO; set LOG_LEVEL=DEBUG for request tracing
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
 from app import auth, quiz, video, progress, notes, user_notes, transcript_pipeline
+from app.database import ensure_indexes
+from app.search_engine import warmup_search_engine
 
 # --- FastAPI Application Initialization ---
 app = FastAPI(
@@ -11,6 +20,15 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# --- Startup Tasks ---
+@app.on_event("startup")
+async def on_startup():
+    # Make sure the indexes behind the hot query shapes exist
+    await ensure_indexes()
+    # Prime the embedding model and ChromaDB index so the first real
+    # request doesn't pay cold-start costs
+    warmup_search_engine()
+
 # --- CORS Configuration ---
 # Allow all origins for local development (restrict in production)
 app.add_middleware(
@@ -19,7 +19,7 @@ from typing import Optional
 import uvicorn
 
 # Import our search engine module
-from app.search_engine import find_best_video, health_check
+from app.search_engine import find_best_video, health_check, warmup_search_engine
 
 # ============================================================================
 # FASTAPI APPLICATION INITIALIZATION
@@ -44,6 +44,12 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+@app.on_event("startup")
+async def on_startup():
+    # Prime the embedding model and ChromaDB index before traffic arrives
+    warmup_search_engine()
+
+
 # Enable CORS for frontend integration
 app.add_middleware(
     CORSMiddleware,
@@ -93,7 +99,7 @@ async def recommend_video(
         return {"status": "error", "message": "Topic cannot be empty"}
     
     # Call search engine with filters
-    results = find_best_video(clean_topic, difficulty=difficulty, style=style, granularity=granularity)
+    results = await find_best_video(clean_topic, difficulty=difficulty, style=style, granularity=granularity)
     
     if results:
         return {
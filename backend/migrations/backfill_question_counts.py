@@ -0,0 +1,62 @@
+"""
+backfill_question_counts.py - Denormalize Question Counts onto Topics
+
+The quiz menu previously ran questions_collection.count_documents() for
+every topic on every /quiz/topics request. This script backfills a
+`question_count` field on each TOPIC document so the hierarchy fetch can
+read it directly.
+
+NOTE: Any script that inserts or deletes questions afterwards must keep
+the counter in sync with {"$inc": {"question_count": +/-1}} on the topic
+(or simply re-run this backfill).
+
+Usage: python backend/migrations/backfill_question_counts.py
+"""
+
+import os
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Migrations run outside the FastAPI event loop, so they use their own
+# synchronous client instead of the async motor client in app.database.
+MONGODB_URL = os.getenv("MONGODB_URL")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "major_project")
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+questions_collection = db["questions"]
+topics_collection = db["topics"]
+
+
+def backfill_counts():
+    print("Counting questions per topic...")
+
+    # Single aggregation instead of one count query per topic
+    counts = {
+        row["_id"]: row["n"]
+        for row in questions_collection.aggregate([
+            {"$group": {"_id": "$topic_id", "n": {"$sum": 1}}}
+        ])
+    }
+
+    print(f"Found questions under {len(counts)} distinct topic_ids")
+
+    updated = 0
+    for topic in topics_collection.find({}, {"_id": 1}):
+        count = counts.get(topic["_id"], 0)
+        topics_collection.update_one(
+            {"_id": topic["_id"]},
+            {"$set": {"question_count": count}}
+        )
+        updated += 1
+
+    print(f"Backfilled question_count on {updated} topics")
+
+
+if __name__ == "__main__":
+    backfill_counts()
+    client.close()
@@ -0,0 +1,60 @@
+"""
+backfill_question_ids.py - Denormalize Question IDs onto Topics
+
+Quiz generation used a $match + $sample aggregation which has to load the
+whole matching set server-side before sampling. This script backfills a
+`question_ids` array on each TOPIC document so the backend can sample K
+ids in Python and fetch only those documents by _id.
+
+NOTE: Scripts that insert or delete questions afterwards must keep the
+array in sync ($push / $pull on the topic) or re-run this backfill.
+
+Usage: python backend/migrations/backfill_question_ids.py
+"""
+
+import os
+
+from pymongo import MongoClient
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Migrations run outside the FastAPI event loop, so they use their own
+# synchronous client instead of the async motor client in app.database.
+MONGODB_URL = os.getenv("MONGODB_URL")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "major_project")
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+questions_collection = db["questions"]
+topics_collection = db["topics"]
+
+
+def backfill_question_ids():
+    print("Collecting question ids per topic...")
+
+    # Single aggregation: group all question _ids under their topic_id
+    ids_by_topic = {
+        row["_id"]: row["ids"]
+        for row in questions_collection.aggregate([
+            {"$group": {"_id": "$topic_id", "ids": {"$push": "$_id"}}}
+        ])
+    }
+
+    print(f"Found questions under {len(ids_by_topic)} distinct topic_ids")
+
+    updated = 0
+    for topic in topics_collection.find({}, {"_id": 1}):
+        topics_collection.update_one(
+            {"_id": topic["_id"]},
+            {"$set": {"question_ids": ids_by_topic.get(topic["_id"], [])}}
+        )
+        updated += 1
+
+    print(f"Backfilled question_ids on {updated} topics")
+
+
+if __name__ == "__main__":
+    backfill_question_ids()
+    client.close()
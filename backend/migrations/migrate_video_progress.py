@@ -0,0 +1,73 @@
+"""
+migrate_video_progress.py - Move Embedded Video Maps to video_progress
+
+user_progress documents used to embed per-video state under a
+`videos: {video_id: {...}}` map, so every video update rewrote a path in
+the user's (growing) progress document and every dashboard read pulled
+all of it. The backend now stores one small document per (user, video)
+in the `video_progress` collection; this script moves the legacy
+embedded data over and unsets the old map.
+
+Safe to re-run: existing (user_id, video_id) docs are upserted.
+
+Usage: python backend/migrations/migrate_video_progress.py
+"""
+
+import os
+
+from pymongo import MongoClient, UpdateOne
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Migrations run outside the FastAPI event loop, so they use their own
+# synchronous client instead of the async motor client in app.database.
+MONGODB_URL = os.getenv("MONGODB_URL")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "major_project")
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+progress_collection = db["user_progress"]
+video_progress_collection = db["video_progress"]
+
+
+def migrate_video_progress():
+    print("Migrating embedded video maps to video_progress...")
+
+    migrated_docs = 0
+    migrated_videos = 0
+
+    for doc in progress_collection.find(
+        {"videos": {"$exists": True, "$ne": {}}},
+        {"user_id": 1, "videos": 1}
+    ):
+        user_id = doc.get("user_id")
+        videos = doc.get("videos") or {}
+        if not user_id or not videos:
+            continue
+
+        requests = [
+            UpdateOne(
+                {"user_id": user_id, "video_id": video_id},
+                {"$set": dict(data, user_id=user_id, video_id=video_id)},
+                upsert=True
+            )
+            for video_id, data in videos.items()
+            if isinstance(data, dict)
+        ]
+        if requests:
+            video_progress_collection.bulk_write(requests, ordered=False)
+            migrated_videos += len(requests)
+
+        progress_collection.update_one(
+            {"_id": doc["_id"]}, {"$unset": {"videos": ""}}
+        )
+        migrated_docs += 1
+
+    print(f"Migrated {migrated_videos} videos from {migrated_docs} progress docs")
+
+
+if __name__ == "__main__":
+    migrate_video_progress()
+    client.close()
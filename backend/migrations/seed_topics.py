@@ -7,13 +7,31 @@ It defines the relationship between Subjects, Modules, and Topics.
 Usage: python backend/migrations/seed_topics.py
 """
 
-import sys
 import os
 
-# Add parent directory to path so we can import 'app'
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymongo import MongoClient
+from dotenv import load_dotenv
 
-from app.database import topics_collection, is_db_connected
+load_dotenv()
+
+# Migrations run outside the FastAPI event loop, so they use their own
+# synchronous client instead of the async motor client in app.database.
+MONGODB_URL = os.getenv("MONGODB_URL")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "major_project")
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+topics_collection = db["topics"]
+
+
+
+def is_db_connected() -> bool:
+    try:
+        client.admin.command('ping')
+        return True
+    except Exception:
+        return False
 
 def seed_hierarchy():
     if not is_db_connected():
@@ -11,13 +11,32 @@ Updates questions to use the 5-Pillar Diagnosis System:
 Usage: python backend/migrations/update_metadata_5pillars.py
 """
 
-import sys
 import os
 import random
 
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymongo import MongoClient
+from dotenv import load_dotenv
 
-from app.database import questions_collection, is_db_connected
+load_dotenv()
+
+# Migrations run outside the FastAPI event loop, so they use their own
+# synchronous client instead of the async motor client in app.database.
+MONGODB_URL = os.getenv("MONGODB_URL")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "major_project")
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+questions_collection = db["questions"]
+
+
+
+def is_db_connected() -> bool:
+    try:
+        client.admin.command('ping')
+        return True
+    except Exception:
+        return False
 
 PILLAR_KEYWORDS = {
     "Complexity": ["complexity", "big-o", "time", "space", "efficiency", "worst case", "best case", "o(1)", "o(n)"],
@@ -10,14 +10,33 @@ This script updates existing questions with "Intelligence Fields":
 Usage: python backend/migrations/update_questions_metadata.py
 """
 
-import sys
 import os
 import random
 
-# Add parent directory to path
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pymongo import MongoClient
+from dotenv import load_dotenv
 
-from app.database import questions_collection, topics_collection, is_db_connected
+load_dotenv()
+
+# Migrations run outside the FastAPI event loop, so they use their own
+# synchronous client instead of the async motor client in app.database.
+MONGODB_URL = os.getenv("MONGODB_URL")
+DATABASE_NAME = os.getenv("DATABASE_NAME", "major_project")
+
+client = MongoClient(MONGODB_URL)
+db = client[DATABASE_NAME]
+
+questions_collection = db["questions"]
+topics_collection = db["topics"]
+
+
+
+def is_db_connected() -> bool:
+    try:
+        client.admin.command('ping')
+        return True
+    except Exception:
+        return False
 
 # Keyword mapping for Micro-Tags
 MICRO_TAG_RULES = {